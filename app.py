@@ -2,6 +2,7 @@ import os
 import json
 import logging
 from flask import Flask
+from markupsafe import Markup, escape
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Set up logging
@@ -12,20 +13,63 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure session storage
+# Configure contract storage (CONTRACTS_STORAGE is the legacy JSON directory, see `flask migrate-contracts`)
 app.config['CONTRACTS_STORAGE'] = 'contracts_data'
+app.config['CONTRACTS_DB'] = os.environ.get('CONTRACTS_DB', os.path.join(app.instance_path, 'cp_generator.db'))
 
 # Configure upload settings
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['GENERATED_FOLDER'] = 'generated'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# DOCX/PDF files are rendered on first download and cached in GENERATED_FOLDER up to this size
+app.config['RENDER_CACHE_MAX_BYTES'] = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Download offload: '' (serve from Python), 'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx,
+# with an internal location at DOWNLOAD_ACCEL_PREFIX aliased to GENERATED_FOLDER)
+app.config['DOWNLOAD_OFFLOAD'] = os.environ.get('DOWNLOAD_OFFLOAD', '')
+app.config['DOWNLOAD_ACCEL_PREFIX'] = os.environ.get('DOWNLOAD_ACCEL_PREFIX', '/protected-generated/')
+# PDF layout: 'platypus' (justified), 'fast' (direct canvas text) or 'auto' (fast from PDF_FAST_LAYOUT_MIN_CHARS on)
+app.config['PDF_LAYOUT'] = os.environ.get('PDF_LAYOUT', 'auto')
+app.config['PDF_FAST_LAYOUT_MIN_CHARS'] = int(os.environ.get('PDF_FAST_LAYOUT_MIN_CHARS', 250000))
+
+# Configure PDF text extraction (files with at least PDF_PARALLEL_MIN_PAGES pages are split over worker processes)
+app.config['PDF_EXTRACTION_WORKERS'] = int(os.environ.get('PDF_EXTRACTION_WORKERS', 2))
+app.config['PDF_PARALLEL_MIN_PAGES'] = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 16))
+app.config['PDF_PAGE_TIMEOUT'] = float(os.environ.get('PDF_PAGE_TIMEOUT', 30))  # seconds per page
+app.config['PDF_MAX_PAGES'] = int(os.environ.get('PDF_MAX_PAGES', 500))
+
+# Configure background processing (0 runs the pipeline inline within the request)
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+
+# Configure NLP execution ('process' parses the input documents in parallel worker processes)
+app.config['NLP_EXECUTION_MODE'] = os.environ.get('NLP_EXECUTION_MODE', 'sequential')
+app.config['NLP_WORKERS'] = int(os.environ.get('NLP_WORKERS', 3))
+# Pipeline profile: 'full', 'fast' (senter instead of parser) or 'fast_no_ner'
+app.config['NLP_PIPELINE_PROFILE'] = os.environ.get('NLP_PIPELINE_PROFILE', 'full')
+# Documents longer than this are parsed in windows of about this many characters
+app.config['NLP_CHUNK_CHARS'] = int(os.environ.get('NLP_CHUNK_CHARS', 100000))
+# Optional JSON file of extra key terms per clause category, e.g. {"port_clauses": ["lighterage"]}
+app.config['CLAUSE_TAXONOMY_PATH'] = os.environ.get('CLAUSE_TAXONOMY_PATH')
+# Persistent cache of per-document extraction results (set the path to '' to disable)
+app.config['EXTRACTION_CACHE_PATH'] = os.environ.get('EXTRACTION_CACHE_PATH', os.path.join(app.instance_path, 'extraction_cache.db'))
+app.config['EXTRACTION_CACHE_MAX_BYTES'] = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Configure preview body chunks (blocks per request from /preview/<id>/body)
+app.config['PREVIEW_CHUNK_BLOCKS'] = int(os.environ.get('PREVIEW_CHUNK_BLOCKS', 200))
+app.config['PREVIEW_MAX_CHUNK_BLOCKS'] = 1000
+
+# Configure contract history pagination
+app.config['HISTORY_PAGE_SIZE'] = int(os.environ.get('HISTORY_PAGE_SIZE', 25))
+app.config['HISTORY_MAX_PAGE_SIZE'] = 100
 
 # Ensure upload and generated directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['GENERATED_FOLDER'], exist_ok=True)
 
-# Ensure contracts storage directory exists
-os.makedirs(app.config['CONTRACTS_STORAGE'], exist_ok=True)
+@app.template_filter('search_snippet')
+def search_snippet_filter(value):
+    """Escape a search snippet, marking the matched terms"""
+    from contract_store import SNIPPET_START, SNIPPET_END
+    return Markup(str(escape(value or '')).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
 
 # Add custom template filter for JSON parsing
 @app.template_filter('fromjson')
@@ -37,9 +81,10 @@ def fromjson_filter(value):
             return {}
     return {}
 
-# Import models and routes
+# Import models, routes and CLI commands
 import models
 import routes
+import commands
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,76 @@
+"""Match count and time of the clause Matcher with and without greedy longest-match filtering.
+
+The legacy matcher is the same pattern set added without ``greedy``, whose matches were
+all turned into strings and deduplicated by the final set() in NLPProcessor._finalize.
+
+Usage: python benchmarks/bench_matcher_spans.py [--scale 1 10 50] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spacy.matcher import Matcher
+
+from nlp_processor import NLPProcessor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABELS = ('PAYMENT_TERMS', 'LAYTIME', 'CARGO')
+
+def legacy_matcher(processor: NLPProcessor) -> Matcher:
+    matcher = Matcher(processor.nlp.vocab)
+    for label in LABELS:
+        _, patterns = processor.matcher.get(label)
+        matcher.add(label, patterns)
+    return matcher
+
+def legacy_extract(matcher: Matcher, doc) -> int:
+    """Old _extract_pattern_matches followed by the string dedup of _finalize; returns the clause count"""
+    found = {label: [] for label in LABELS}
+    for match_id, start, end in matcher(doc):
+        found[doc.vocab.strings[match_id]].append(doc[start:end].text)
+    return sum(len({clause.strip() for clause in clauses}) for clauses in found.values())
+
+def best_of(repeat: int, run):
+    best = result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 50], help='copies of the sample base CP')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per matcher, best time is reported')
+    args = parser.parse_args()
+    
+    processor = NLPProcessor(profile='fast')
+    if processor.nlp is None:
+        sys.exit("en_core_web_sm is not installed (python -m spacy download en_core_web_sm)")
+    legacy = legacy_matcher(processor)
+    with open(os.path.join(ROOT, 'sample_base_contract.txt')) as f:
+        base_cp = f.read()
+    
+    print(f"{'scale':>5} {'chars':>9} {'matcher':<8} {'matches':>9} {'clauses':>8} {'seconds':>8} {'speedup':>8}")
+    for scale in args.scale:
+        content = '\n\n'.join([base_cp] * scale)
+        processor.nlp.max_length = max(processor.nlp.max_length, len(content) + 1)
+        doc = processor.nlp(content)
+        
+        legacy_time, legacy_clauses = best_of(args.repeat, lambda: legacy_extract(legacy, doc))
+        greedy_time, matches = best_of(args.repeat, lambda: processor._extract_pattern_matches(doc))
+        greedy_clauses = len({(category, content[start:end].strip()) for start, end, category, _ in matches})
+        rows = [
+            ('legacy', len(legacy(doc)), legacy_clauses, legacy_time),
+            ('greedy', len(processor.matcher(doc)), greedy_clauses, greedy_time),
+        ]
+        for name, match_count, clauses, elapsed in rows:
+            print(f"{scale:>5} {len(content):>9} {name:<8} {match_count:>9} {clauses:>8} {elapsed:>8.3f} "
+                  f"{legacy_time / elapsed:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Throughput and result parity of the NLP pipeline profiles on the sample documents.
+
+Usage: python benchmarks/bench_nlp_profiles.py [--repeat 20] [--scale 10]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_processor import NLPProcessor, PIPELINE_PROFILES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = {
+    'fixture_recap': 'sample_fixture_recap.txt',
+    'base_cp': 'sample_base_contract.txt',
+    'negotiated_clauses': 'sample_negotiated_clauses.txt',
+}
+
+def load_samples(scale: int) -> dict:
+    documents = {}
+    for doc_type, filename in SAMPLES.items():
+        with open(os.path.join(ROOT, filename)) as f:
+            documents[doc_type] = '\n\n'.join([f.read()] * scale)
+    return documents
+
+def overlap(result: dict, reference: dict) -> float:
+    """Share of the reference clauses (over all categories) that the result also found"""
+    expected = {(category, clause) for category, clauses in reference.items() for clause in clauses}
+    found = {(category, clause) for category, clauses in result.items() for clause in clauses}
+    return len(expected & found) / len(expected) if expected else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='extraction runs per profile')
+    parser.add_argument('--scale', type=int, default=10, help='copies of each sample per document')
+    args = parser.parse_args()
+    
+    documents = load_samples(args.scale)
+    chars = sum(len(content) for content in documents.values())
+    reference = None
+    
+    print(f"{'profile':<12} {'components':<45} {'docs/s':>8} {'kchars/s':>9} {'parity':>7}")
+    for profile in PIPELINE_PROFILES:
+        processor = NLPProcessor(profile=profile)
+        if processor.nlp is None:
+            sys.exit("en_core_web_sm is not installed (python -m spacy download en_core_web_sm)")
+        result = processor.extract_clauses(documents)  # warm-up
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            processor.extract_clauses(documents)
+        elapsed = time.perf_counter() - start
+        
+        if reference is None:
+            reference = result
+        docs_per_sec = args.repeat * len(documents) / elapsed
+        print(f"{profile:<12} {','.join(processor.nlp.pipe_names):<45} "
+              f"{docs_per_sec:>8.1f} {args.repeat * chars / elapsed / 1000:>9.1f} "
+              f"{overlap(result, reference):>6.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Render time of the PDF layouts on generated contracts of a given page count.
+
+Usage: python benchmarks/bench_pdf_render.py [--pages 50 500] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+
+from app import app  # noqa: F401  (document_processor expects the app to be configured)
+from document_processor import DocumentProcessor
+from contract_blocks import parse_contract_blocks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = {
+    'fixture_recap': 'sample_fixture_recap.txt',
+    'base_cp': 'sample_base_contract.txt',
+    'negotiated_clauses': 'sample_negotiated_clauses.txt',
+}
+
+def legacy_create_pdf(content: str, file_path: str, title: str):
+    """The renderer before styles were cached: fresh stylesheet and chained replace() per paragraph"""
+    doc = SimpleDocTemplate(file_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], alignment=TA_CENTER,
+                                 fontSize=16, spaceAfter=20)
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14,
+                                   spaceAfter=12, spaceBefore=12)
+    body_style = ParagraphStyle('CustomBody', parent=styles['Normal'], alignment=TA_JUSTIFY,
+                                fontSize=10, spaceAfter=6)
+    story = [Paragraph(title, title_style), Paragraph('Generated: now', styles['Normal']), Spacer(1, 20)]
+    for section in content.split('==='):
+        section = section.strip()
+        if not section:
+            continue
+        if section.isupper() and len(section) < 50:
+            story.append(Paragraph(section, heading_style))
+            continue
+        for para in section.split('\n\n'):
+            para = para.strip()
+            if not para:
+                continue
+            if para.isupper() and len(para) < 100:
+                story.append(Paragraph(para, heading_style))
+            else:
+                para = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                story.append(Paragraph(para.replace('\n', '<br/>'), body_style))
+    doc.build(story)
+
+def build_contract(processor: DocumentProcessor, scale: int) -> str:
+    documents = {}
+    for doc_type, filename in SAMPLES.items():
+        with open(os.path.join(ROOT, filename)) as f:
+            documents[doc_type] = '\n\n'.join([f.read()] * scale)
+    return processor.merge_documents(documents, {})
+
+def page_count(path: str) -> int:
+    with open(path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+def timed(render, document, path: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(document, path, 'Benchmark Charter Party')
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 500], help='target page counts')
+    parser.add_argument('--repeat', type=int, default=3, help='renders per layout, best time is reported')
+    args = parser.parse_args()
+    
+    platypus = DocumentProcessor(pdf_layout='platypus')
+    fast = DocumentProcessor(pdf_layout='fast')
+    layouts = {
+        'legacy': legacy_create_pdf,
+        'platypus': platypus._create_pdf,
+        'fast': fast._create_pdf,
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'contract.pdf')
+        # Calibrate how many copies of the samples make a page
+        platypus._create_pdf(parse_contract_blocks(build_contract(platypus, 10)), path, 'Calibration')
+        pages_per_copy = page_count(path) / 10
+        
+        print(f"{'pages':>6} {'chars':>10} {'layout':<9} {'seconds':>8} {'pdf pages':>9} {'speedup':>8}")
+        for target in args.pages:
+            content = build_contract(platypus, max(1, round(target / pages_per_copy)))
+            blocks = parse_contract_blocks(content)
+            baseline = None
+            for name, render in layouts.items():
+                # The legacy renderer parsed the merged text itself
+                elapsed = timed(render, content if name == 'legacy' else blocks, path, args.repeat)
+                baseline = baseline or elapsed
+                print(f"{target:>6} {len(content):>10} {name:<9} {elapsed:>8.2f} {page_count(path):>9} "
+                      f"{baseline / elapsed:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Full-text search latency of the contract store at a given number of contracts.
+
+Contracts share the sample base CP, as most fixtures on a standard form do, and get
+generated fixture recaps with varying ports so terms range from rare to everywhere.
+
+Usage: python benchmarks/bench_search.py [--contracts 20000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contract_store import ContractStore
+from contract_clauses import ClauseSet, ClauseSpan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORTS = ['Santos', 'Rotterdam', 'Houston', 'Singapore', 'Fujairah', 'Qingdao', 'Tubarao', 'Ras Tanura']
+CARGOES = ['iron ore', 'crude oil', 'soybeans', 'coal', 'fuel oil', 'wheat']
+QUERIES = [
+    'Santos discharge',    # one port in eight, in the recaps
+    '"Ras Tanura" crude',  # phrase plus a word
+    'demurrage',           # only in the shared base CP
+    'laytime clauses',     # clause categories of every other contract
+    'Fixture 1234',        # contract name
+    'Fixt 12',             # partial name
+    'nonexistent',
+]
+
+def make_recap(rng: random.Random, number: int) -> str:
+    load, discharge = rng.sample(PORTS, 2)
+    return (f"Fixture recap {number}\nVessel: MV Example {number}\nCargo: {rng.randrange(20, 200)},000 mt "
+            f"{rng.choice(CARGOES)}\nLoad port: {load}\nDischarge port: {discharge}\n"
+            f"Freight: USD {rng.randrange(10, 40)}.50 per mt\nLaytime: {rng.randrange(2, 8)} days SHINC\n")
+
+def populate(store: ContractStore, count: int, base_cp: str):
+    rng = random.Random(42)
+    for number in range(count):
+        recap = make_recap(rng, number)
+        spans = [ClauseSpan('fixture_recap', 0, 10, 'laytime_clauses')] if number % 2 else []
+        store.save({'id': f'bench-{number:06d}', 'contract_name': f'Fixture {number}', 'status': 'completed',
+                    'created_at': f'2024-01-01T00:00:00.{number:06d}', 'updated_at': f'2024-01-01T00:00:00.{number:06d}'},
+                   {'fixture_recap_content': recap, 'base_cp_content': base_cp,
+                    'extracted_clauses': ClauseSet(spans, {}).dump()})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--contracts', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per query, best time is reported')
+    args = parser.parse_args()
+    
+    with open(os.path.join(ROOT, 'sample_base_contract.txt')) as f:
+        base_cp = f.read()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ContractStore(os.path.join(tmp, 'search.db'))
+        start = time.perf_counter()
+        populate(store, args.contracts, base_cp)
+        print(f"indexed {args.contracts} contracts in {time.perf_counter() - start:.1f}s")
+        
+        print(f"{'query':<22} {'page':>4} {'results':>8} {'more':>5} {'ms':>8}")
+        for query in QUERIES:
+            for page in (1, 5):
+                best = None
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    results, has_more = store.search(query, limit=25, offset=(page - 1) * 25)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f"{query:<22} {page:>4} {len(results):>8} {str(has_more):>5} {best * 1000:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Concurrent writers and readers against one contract store, checking every read for consistency.
+
+Writer processes walk contracts through the upload lifecycle: save as processing,
+attach bodies, complete, and occasionally fail or delete them. Reader processes
+page through the history, load contracts and read their bodies. Each body embeds
+a checksum of itself, so a torn or mixed-up read is detected rather than just
+counted.
+
+Usage: python benchmarks/load_test_store.py [--writers 4] [--readers 4] [--seconds 10] [--body-kb 64]
+"""
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ('processing', 'completed', 'error')
+
+def make_body(seed: str, size: int) -> str:
+    text = (seed * (size // len(seed) + 1))[:size]
+    return f"{hashlib.sha256(text.encode()).hexdigest()}\n{text}"
+
+def body_ok(body: str) -> bool:
+    digest, _, text = body.partition('\n')
+    return hashlib.sha256(text.encode()).hexdigest() == digest
+
+def open_store(db_path: str):
+    """Start the app against db_path; it loads spaCy and more, so do this before timing"""
+    os.environ['CONTRACTS_DB'] = db_path
+    os.environ['EXTRACTION_CACHE_PATH'] = ''  # Keep the run from creating a cache in instance/
+    from contract_store import get_store
+    get_store()
+
+def writer(db_path: str, seconds: float, body_size: int, results):
+    open_store(db_path)
+    from models import Contract
+    deadline = time.time() + seconds
+    ops = errors = 0
+    rng = random.Random(os.getpid())
+    while time.time() < deadline:
+        try:
+            contract = Contract(contract_name=f'Load {rng.randrange(10 ** 6)}', status='processing')
+            contract.fixture_recap_content = make_body(f'recap {contract.id} ', body_size // 8)
+            contract.save()
+            contract.base_cp_content = make_body(f'base {rng.randrange(20)} ', body_size)  # shared blobs
+            contract.final_contract_content = make_body(f'final {contract.id} ', body_size)
+            contract.status = 'completed'
+            contract.save()
+            roll = rng.random()
+            if roll < 0.2:
+                contract.update_status('error')
+            elif roll < 0.3:
+                contract.delete()
+            ops += 3
+        except Exception as e:
+            errors += 1
+            print(f"writer error: {e!r}", file=sys.stderr)
+    results.put(('write', ops, errors))
+
+def reader(db_path: str, seconds: float, results):
+    open_store(db_path)
+    from models import Contract
+    deadline = time.time() + seconds
+    ops = errors = 0
+    while time.time() < deadline:
+        try:
+            page = Contract.get_page(per_page=25)
+            for contract in page.items:
+                if contract.status not in STATUSES:
+                    raise AssertionError(f"bad status {contract.status!r}")
+                full = Contract.load(contract.id)
+                if full is None:
+                    continue  # Deleted since the listing
+                for body in (full.fixture_recap_content, full.base_cp_content, full.final_contract_content):
+                    if body is not None and not body_ok(body):
+                        raise AssertionError(f"corrupted body in {contract.id}")
+                ops += 1
+            Contract.status_counts()
+            ops += 1
+        except Exception as e:
+            errors += 1
+            print(f"reader error: {e!r}", file=sys.stderr)
+    results.put(('read', ops, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--body-kb', type=int, default=64, help='size of the base CP and final contract bodies')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load_test.db')
+        os.environ['CONTRACTS_DB'] = db_path
+        from contract_store import ContractStore
+        ContractStore(db_path)  # Create the schema before the workers race for it
+        
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        workers = [ctx.Process(target=writer, args=(db_path, args.seconds, args.body_kb * 1024, results))
+                   for _ in range(args.writers)]
+        workers += [ctx.Process(target=reader, args=(db_path, args.seconds, results)) for _ in range(args.readers)]
+        for worker in workers:
+            worker.start()
+        totals = {'write': [0, 0], 'read': [0, 0]}
+        for _ in workers:
+            kind, ops, errors = results.get()
+            totals[kind][0] += ops
+            totals[kind][1] += errors
+        for worker in workers:
+            worker.join()
+        
+        store = ContractStore(db_path)
+        counts = store.status_counts()
+        actual = {row['status']: row['n'] for row in store._connect().execute(
+            'SELECT status, COUNT(*) AS n FROM contracts GROUP BY status')}
+        integrity = store._connect().execute('PRAGMA integrity_check').fetchone()[0]
+    
+    for kind, (ops, errors) in totals.items():
+        print(f"{kind:<6} {ops:>8} ops {ops / args.seconds:>9.1f} ops/s {errors:>5} errors")
+    print(f"status counters {'match' if counts == actual else 'MISMATCH'}: {counts}")
+    print(f"integrity check: {integrity}")
+    if any(errors for _, errors in totals.values()) or counts != actual or integrity != 'ok':
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
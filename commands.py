@@ -0,0 +1,107 @@
+import os
+import click
+from werkzeug.datastructures import FileStorage
+from app import app
+from contract_clauses import resolve_clauses
+from contract_store import get_store
+from models import Contract
+from pipeline import DOCUMENT_TYPES
+from routes import ALLOWED_EXTENSIONS, doc_processor, extraction_cache, nlp_processor, pipeline
+
+@app.cli.command('migrate-contracts')
+@click.option('--storage-dir', default=None, help='Legacy JSON contract directory (defaults to CONTRACTS_STORAGE)')
+def migrate_contracts(storage_dir):
+    """Import legacy JSON contract files into the contract store"""
+    storage_dir = storage_dir or app.config['CONTRACTS_STORAGE']
+    migrated = get_store().migrate_json_dir(storage_dir)
+    click.echo(f"Migrated {migrated} contract(s) from {storage_dir}")
+
+@app.cli.command('extraction-cache')
+@click.option('--clear', is_flag=True, help='Remove all cached extraction results')
+def extraction_cache_stats(clear):
+    """Show hit/miss counters of the clause extraction cache"""
+    if extraction_cache is None:
+        raise click.ClickException('The extraction cache is disabled (EXTRACTION_CACHE_PATH is empty)')
+    if clear:
+        extraction_cache.clear()
+    for name, value in extraction_cache.stats().items():
+        click.echo(f"{name}: {value}")
+
+def _read_document(path: str) -> str:
+    with open(path, 'rb') as f:
+        return doc_processor.extract_text_from_file(FileStorage(stream=f, filename=os.path.basename(path)))
+
+def _find_documents(contract_dir: str) -> dict:
+    """Map document types to files named after them, e.g. base_cp.pdf or fixture_recap.txt"""
+    found = {}
+    for filename in sorted(os.listdir(contract_dir)):
+        stem, _, extension = filename.rpartition('.')
+        if stem in DOCUMENT_TYPES and extension.lower() in ALLOWED_EXTENSIONS:
+            found.setdefault(stem, os.path.join(contract_dir, filename))
+    return found
+
+@app.cli.command('ingest-contracts')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--base-cp', type=click.Path(exists=True, dir_okay=False),
+              help='Base charter party used for contracts that do not include their own')
+@click.option('--batch-size', default=32, show_default=True, help='Documents per nlp.pipe batch')
+@click.option('--n-process', default=1, show_default=True, help='spaCy worker processes')
+def ingest_contracts(directory, base_cp, batch_size, n_process):
+    """Bulk-create contracts from DIRECTORY.
+    
+    Every subdirectory becomes one contract named after it, built from the files
+    fixture_recap.*, base_cp.* and negotiated_clauses.* it contains.
+    """
+    shared_base_cp = _read_document(base_cp) if base_cp else None
+    
+    def document_sets():
+        for name in sorted(os.listdir(directory)):
+            contract_dir = os.path.join(directory, name)
+            if not os.path.isdir(contract_dir):
+                continue
+            try:
+                document_contents = {doc_type: _read_document(path)
+                                     for doc_type, path in _find_documents(contract_dir).items()}
+            except Exception as e:
+                click.echo(f"Skipping {name}: {str(e)}", err=True)
+                continue
+            if shared_base_cp and not document_contents.get('base_cp'):
+                document_contents['base_cp'] = shared_base_cp
+            if not any(document_contents.values()):
+                click.echo(f"Skipping {name}: no documents found", err=True)
+                continue
+            yield document_contents, (name, document_contents)
+    
+    ingested = 0
+    for clause_spans, (name, document_contents) in nlp_processor.extract_clauses_batch(
+            document_sets(), batch_size=batch_size, n_process=n_process, as_tuples=True):
+        contract = Contract(contract_name=name, status='processing')
+        try:
+            pipeline.complete(contract, document_contents, clause_spans)
+        except Exception as e:
+            contract.status = 'error'
+            contract.save()
+            click.echo(f"Failed {name}: {str(e)}", err=True)
+            continue
+        ingested += 1
+        click.echo(f"Ingested {name} ({contract.id})")
+    click.echo(f"Ingested {ingested} contract(s) from {directory}")
+
+@app.cli.command('merge-contract')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.argument('output', type=click.File('w', encoding='utf-8'))
+def merge_contract(directory, output):
+    """Merge the documents in DIRECTORY into OUTPUT without storing a contract.
+    
+    Takes the same fixture_recap.*, base_cp.* and negotiated_clauses.* files as
+    ingest-contracts. The merged contract is written to OUTPUT as it is produced, so
+    large base CPs are never copied whole in memory; use - to print it.
+    """
+    found = _find_documents(directory)
+    # In pipeline order, which the clause summary follows
+    document_contents = {doc_type: _read_document(found[doc_type]) for doc_type in DOCUMENT_TYPES if doc_type in found}
+    if not any(document_contents.values()):
+        raise click.ClickException(f"No documents found in {directory}")
+    extracted_clauses = resolve_clauses(nlp_processor.extract_clause_spans(document_contents), document_contents)
+    length = doc_processor.write_merged_document(document_contents, extracted_clauses, output)
+    click.echo(f"Merged {len(document_contents)} document(s) into {length} characters", err=True)
@@ -0,0 +1,53 @@
+from typing import Iterator, List, NamedTuple
+from contract_store import dump_json, load_json
+
+# Block levels: body paragraph, "=== SECTION ===" header, all-caps subsection header
+PARAGRAPH = 0
+SECTION = 1
+HEADING = 2
+
+class ContractBlock(NamedTuple):
+    """One heading or paragraph of a merged contract; serializes as a compact [level, text, start] list"""
+    level: int
+    text: str
+    start: int = -1  # Offset of the text in the merged contract, -1 if unknown
+
+def _lstripped(text: str) -> int:
+    """Number of leading whitespace characters that strip() removes"""
+    return len(text) - len(text.lstrip())
+
+def iter_contract_blocks(content: str) -> Iterator[ContractBlock]:
+    """Split merge_documents output into typed heading/paragraph blocks"""
+    position = 0
+    for section in content.split('==='):
+        section_start = position + _lstripped(section)
+        position += len(section) + 3
+        section = section.strip()
+        if not section:
+            continue
+        
+        # Check if this is a section header
+        if section.isupper() and len(section) < 50:
+            yield ContractBlock(SECTION, section, section_start)
+        else:
+            # Split into paragraphs
+            para_position = section_start
+            for para in section.split('\n\n'):
+                para_start = para_position + _lstripped(para)
+                para_position += len(para) + 2
+                para = para.strip()
+                if para:
+                    if para.isupper() and len(para) < 100:
+                        yield ContractBlock(HEADING, para, para_start)
+                    else:
+                        yield ContractBlock(PARAGRAPH, para, para_start)
+
+def parse_contract_blocks(content: str) -> List[ContractBlock]:
+    return list(iter_contract_blocks(content))
+
+def dump_blocks(blocks: List[ContractBlock]) -> str:
+    return dump_json([list(block) for block in blocks])
+
+def load_blocks(data: str) -> List[ContractBlock]:
+    # Blocks stored before offsets were recorded are [level, text] pairs
+    return [ContractBlock(*block) for block in load_json(data)]
@@ -0,0 +1,95 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from contract_store import dump_json, load_json
+
+class ClauseSpan(NamedTuple):
+    """One extracted clause: a character range of a source document and its category"""
+    source: str  # Document type, e.g. 'base_cp'
+    start: int
+    end: int
+    category: str
+    label: Optional[str] = None  # Entity label, for key_entities
+    
+    def text(self, contents: Dict[str, str]) -> str:
+        text = contents[self.source][self.start:self.end]
+        return f"{text} ({self.label})" if self.label else text
+
+def strip_offsets(content: str, start: int, end: int) -> Tuple[int, int]:
+    """Narrow a range of content so it excludes surrounding whitespace, as str.strip() would"""
+    text = content[start:end]
+    stripped = text.lstrip()
+    start += len(text) - len(stripped)
+    return start, start + len(stripped.rstrip())
+
+def resolve_clauses(spans: Iterable[ClauseSpan], contents: Dict[str, str],
+                    categories: Iterable[str] = ()) -> Dict[str, List[str]]:
+    """Clause texts by category, each text listed once, in order of first occurrence"""
+    resolved = {category: {} for category in categories}
+    for span in spans:
+        text = span.text(contents)
+        if text:
+            resolved.setdefault(span.category, {})[text] = None
+    return {category: list(texts) for category, texts in resolved.items()}
+
+class ClauseSet:
+    """Stored extraction result: clause spans plus where each source starts in the final contract.
+    
+    Serializes as {"sources": {source: offset}, "spans": {source: {category: [start, end, ...]}}},
+    with entity labels folded into the category as "key_entities:ORG", so each clause
+    costs two numbers rather than a copy of its text. The source offsets place the spans
+    in the final contract, which is how the preview highlights them in place.
+    """
+    
+    def __init__(self, spans: Sequence[ClauseSpan], sources: Dict[str, Optional[int]]):
+        self.spans = tuple(spans)
+        self.sources = sources
+        self._ranges = None
+    
+    def dump(self) -> str:
+        grouped = {}
+        for span in self.spans:
+            key = f"{span.category}:{span.label}" if span.label else span.category
+            grouped.setdefault(span.source, {}).setdefault(key, []).extend((span.start, span.end))
+        return dump_json({'sources': self.sources, 'spans': grouped})
+    
+    @classmethod
+    def load(cls, data: str) -> Optional['ClauseSet']:
+        """Parse a stored result; None for the older format of clause texts by category"""
+        value = load_json(data)
+        if not isinstance(value, dict) or set(value) != {'sources', 'spans'}:
+            return None
+        spans = []
+        for source, categories in value['spans'].items():
+            for key, offsets in categories.items():
+                category, _, label = key.partition(':')
+                spans.extend(ClauseSpan(source, offsets[i], offsets[i + 1], category, label or None)
+                             for i in range(0, len(offsets), 2))
+        return cls(spans, value['sources'])
+    
+    def highlights(self, blocks) -> List[List]:
+        """[block index, start, end, category] for each clause overlapping one of the blocks.
+        
+        Blocks are ContractBlocks of the final contract; start and end are relative to the
+        block text. Blocks without a known offset get no highlights.
+        """
+        if self._ranges is None:
+            ranges = sorted((self.sources[span.source] + span.start, self.sources[span.source] + span.end,
+                             span.category) for span in self.spans if self.sources.get(span.source) is not None)
+            self._ranges = ([start for start, _, _ in ranges], ranges,
+                            max((end - start for start, end, _ in ranges), default=0))
+        starts, ranges, longest = self._ranges
+        
+        marks = []
+        for index, block in enumerate(blocks):
+            if block.start < 0:
+                continue
+            block_end = block.start + len(block.text)
+            # A range overlapping the block starts at most `longest` characters before it
+            i = bisect_left(starts, block.start - longest)
+            while i < len(ranges) and starts[i] < block_end:
+                start, end, category = ranges[i]
+                if end > block.start:
+                    marks.append([index, max(start, block.start) - block.start, min(end, block_end) - block.start,
+                                  category])
+                i += 1
+        return marks
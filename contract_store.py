@@ -0,0 +1,583 @@
+import os
+import re
+import json
+import zlib
+import base64
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # Optional, only makes (de)serializing large clause lists faster
+    orjson = None
+
+# Columns needed to render listings and the dashboard
+METADATA_COLUMNS = ('id', 'contract_name', 'status', 'docx_path', 'pdf_path', 'created_at', 'updated_at')
+
+# Large document bodies, stored as content-addressed blobs and only read on demand
+BODY_FIELDS = ('fixture_recap_content', 'base_cp_content', 'negotiated_clauses_content',
+               'final_contract_content', 'extracted_clauses', 'document_blocks', 'stage_keys')
+
+# Bodies covered by the full-text index
+SEARCH_FIELDS = ('fixture_recap_content', 'base_cp_content', 'negotiated_clauses_content')
+
+# Bodies referenced by at least this many contracts are searched by walking the contracts
+SHARED_BODY_REFS = 64
+
+# Wrapped around matched terms in search snippets
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+SCHEMA_VERSION = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    id TEXT PRIMARY KEY,
+    contract_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'draft',
+    docx_path TEXT,
+    pdf_path TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_contracts_updated ON contracts (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_contracts_status ON contracts (status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_contracts_name ON contracts (contract_name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS contract_blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS contract_bodies (
+    contract_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    blob_hash TEXT NOT NULL,
+    PRIMARY KEY (contract_id, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_contract_bodies_blob ON contract_bodies (blob_hash);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    contract_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    owner TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_contract ON jobs (contract_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+
+-- Per-status contract counts for the dashboard, kept current by triggers on every write path
+CREATE TABLE IF NOT EXISTS contract_stats (
+    status TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS contract_stats_insert AFTER INSERT ON contracts BEGIN
+    INSERT INTO contract_stats (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS contract_stats_update AFTER UPDATE OF status ON contracts
+WHEN OLD.status IS NOT NEW.status BEGIN
+    UPDATE contract_stats SET count = count - 1 WHERE status = OLD.status;
+    INSERT INTO contract_stats (status, count) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS contract_stats_delete AFTER DELETE ON contracts BEGIN
+    UPDATE contract_stats SET count = count - 1 WHERE status = OLD.status;
+END;
+
+-- Full-text index. Each distinct searchable body is one document, so a base CP shared
+-- by many contracts is indexed once; each contract has one more for its name and the
+-- categories of its extracted clauses. search_docs maps index rowids to their owner.
+CREATE TABLE IF NOT EXISTS search_docs (
+    docid INTEGER PRIMARY KEY,
+    blob_hash TEXT UNIQUE,
+    contract_id TEXT UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    name, categories, body, tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+JOB_COLUMNS = ('id', 'contract_id', 'status', 'stage', 'progress', 'message', 'owner', 'created_at', 'updated_at')
+
+def format_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Serialize a datetime so that string order matches chronological order"""
+    return value.isoformat(timespec='microseconds') if value else None
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def encode_cursor(updated_at: str, contract_id: str) -> str:
+    """Opaque keyset cursor for a (updated_at, id) position"""
+    return base64.urlsafe_b64encode(f'{updated_at}|{contract_id}'.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor, raising ValueError on malformed input"""
+    try:
+        updated_at, contract_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+    except (UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return updated_at, contract_id
+
+def dump_json(value: Any) -> str:
+    """Compact JSON for stored bodies, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, separators=(',', ':'))
+
+def load_json(text: str) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+def _split_statements(script: str) -> List[str]:
+    """Split a SQL script into statements, keeping trigger bodies whole.
+    
+    executescript() would commit the schema upgrade's transaction, so statements run one by one.
+    """
+    statements, current = [], ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ''
+    return statements
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def build_match_query(search: str) -> Optional[str]:
+    """FTS5 query for free text: all words must match as prefixes, "quoted phrases" exactly.
+    
+    Terms are quoted so punctuation in user input never reaches the FTS5 query syntax;
+    prefixes keep partial names like "Smo" finding "Smoke test". Returns None when the
+    input has no searchable words.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\w+)', search):
+        if word:
+            terms.append(f'"{word}"*')
+        else:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append(f'"{" ".join(words)}"')
+    return ' '.join(terms) or None
+
+def _clause_categories(text: str) -> str:
+    """Searchable text naming the clause categories of a stored extraction result"""
+    from contract_clauses import ClauseSet  # contract_clauses imports this module
+    try:
+        clause_set = ClauseSet.load(text)
+        if clause_set is not None:
+            categories = dict.fromkeys(span.category for span in clause_set.spans)
+        else:
+            categories = [category for category, clauses in load_json(text).items() if clauses]
+    except (ValueError, TypeError, AttributeError):
+        return ''  # Unreadable legacy value
+    return ' '.join(category.replace('_', ' ') for category in categories)
+
+class ContractStore:
+    """SQLite-backed storage for contract metadata and document bodies"""
+    
+    def __init__(self, db_path: str):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._init_schema()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return a connection owned by the current thread and process"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Write transaction holding the database write lock from the start.
+        
+        Python's default deferred transactions begin on the first write, so a read
+        followed by a write can hit SQLITE_BUSY if another worker commits in between;
+        BEGIN IMMEDIATE instead waits (up to the connection timeout) for the lock.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+    
+    def _init_schema(self):
+        with self._transaction() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(contracts)')}
+            for statement in _split_statements(SCHEMA):
+                conn.execute(statement)
+            inline_fields = [field for field in BODY_FIELDS if field in columns]
+            if inline_fields:
+                self._move_inline_bodies(conn, inline_fields)
+            if version < 4:
+                # Contracts stored before the stats triggers existed
+                conn.execute('DELETE FROM contract_stats')
+                conn.execute('INSERT INTO contract_stats (status, count) '
+                             'SELECT status, COUNT(*) FROM contracts GROUP BY status')
+            if version < 5:
+                self._build_search_index(conn)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
+    def _build_search_index(self, conn: sqlite3.Connection):
+        """Index the contracts stored before the full-text index existed"""
+        self.logger.info("Building the contract search index")
+        rows = conn.execute(f"SELECT DISTINCT blob_hash FROM contract_bodies "
+                            f"WHERE field IN ({', '.join('?' for _ in SEARCH_FIELDS)})", SEARCH_FIELDS).fetchall()
+        for row in rows:
+            self._index_blob(conn, row['blob_hash'], self._read_blob(conn, row['blob_hash']))
+        for row in conn.execute('SELECT id, contract_name FROM contracts').fetchall():
+            clauses_hash = self._body_refs(conn, row['id']).get('extracted_clauses')
+            categories = _clause_categories(self._read_blob(conn, clauses_hash)) if clauses_hash else ''
+            self._index_contract(conn, row['id'], row['contract_name'], categories)
+    
+    @staticmethod
+    def _read_blob(conn: sqlite3.Connection, blob_hash: str) -> Optional[str]:
+        row = conn.execute('SELECT data FROM contract_blobs WHERE hash = ?', (blob_hash,)).fetchone()
+        return zlib.decompress(row['data']).decode('utf-8') if row else None
+    
+    @staticmethod
+    def _index_blob(conn: sqlite3.Connection, blob_hash: str, text: Optional[str]):
+        """Add a body to the search index unless it is already there"""
+        if text is None or conn.execute('SELECT 1 FROM search_docs WHERE blob_hash = ?', (blob_hash,)).fetchone():
+            return
+        docid = conn.execute('INSERT INTO search_docs (blob_hash) VALUES (?)', (blob_hash,)).lastrowid
+        conn.execute("INSERT INTO search_index (rowid, name, categories, body) VALUES (?, '', '', ?)",
+                     (docid, text))
+    
+    @staticmethod
+    def _index_contract(conn: sqlite3.Connection, contract_id: str, name: Optional[str],
+                        categories: Optional[str] = None):
+        """Index a contract's name and, unless None (unchanged), its clause categories"""
+        row = conn.execute('SELECT docid FROM search_docs WHERE contract_id = ?', (contract_id,)).fetchone()
+        if row is None:
+            docid = conn.execute('INSERT INTO search_docs (contract_id) VALUES (?)', (contract_id,)).lastrowid
+            conn.execute("INSERT INTO search_index (rowid, name, categories, body) VALUES (?, ?, ?, '')",
+                         (docid, name or '', categories or ''))
+        elif categories is None:
+            conn.execute('UPDATE search_index SET name = ? WHERE rowid = ?', (name or '', row['docid']))
+        else:
+            conn.execute('UPDATE search_index SET name = ?, categories = ? WHERE rowid = ?',
+                         (name or '', categories, row['docid']))
+    
+    @staticmethod
+    def _unindex(conn: sqlite3.Connection, column: str, key: str):
+        row = conn.execute(f'SELECT docid FROM search_docs WHERE {column} = ?', (key,)).fetchone()
+        if row is not None:
+            conn.execute('DELETE FROM search_index WHERE rowid = ?', (row['docid'],))
+            conn.execute('DELETE FROM search_docs WHERE docid = ?', (row['docid'],))
+    
+    def _move_inline_bodies(self, conn: sqlite3.Connection, fields: List[str]):
+        """Upgrade databases that still keep document bodies inline in the contracts table"""
+        self.logger.info("Moving inline contract bodies into the blob store")
+        rows = conn.execute(f"SELECT id, {', '.join(fields)} FROM contracts").fetchall()
+        for row in rows:
+            self._write_bodies(conn, row['id'], {field: row[field] for field in fields})
+        for field in fields:
+            conn.execute(f'ALTER TABLE contracts DROP COLUMN {field}')
+    
+    def _write_bodies(self, conn: sqlite3.Connection, contract_id: str,
+                      bodies: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Point the given body fields at their blobs and drop blobs nobody references any more"""
+        previous = self._body_refs(conn, contract_id)
+        refs = {}
+        for field, text in bodies.items():
+            if text is None:
+                conn.execute('DELETE FROM contract_bodies WHERE contract_id = ? AND field = ?',
+                             (contract_id, field))
+                continue
+            blob_hash = content_hash(text)
+            conn.execute('INSERT OR IGNORE INTO contract_blobs (hash, size, data) VALUES (?, ?, ?)',
+                         (blob_hash, len(text), zlib.compress(text.encode('utf-8'))))
+            conn.execute('INSERT OR REPLACE INTO contract_bodies (contract_id, field, blob_hash) '
+                         'VALUES (?, ?, ?)', (contract_id, field, blob_hash))
+            if field in SEARCH_FIELDS:
+                self._index_blob(conn, blob_hash, text)
+            refs[field] = blob_hash
+        self._collect_blobs(conn, [previous[field] for field in bodies
+                                   if field in previous and previous[field] != refs.get(field)])
+        return refs
+    
+    def _collect_blobs(self, conn: sqlite3.Connection, hashes: List[str]):
+        for blob_hash in set(hashes):
+            cursor = conn.execute('DELETE FROM contract_blobs WHERE hash = ? AND NOT EXISTS '
+                                  '(SELECT 1 FROM contract_bodies WHERE blob_hash = ?)', (blob_hash, blob_hash))
+            if cursor.rowcount:
+                self._unindex(conn, 'blob_hash', blob_hash)
+    
+    @staticmethod
+    def _body_refs(conn: sqlite3.Connection, contract_id: str) -> Dict[str, str]:
+        rows = conn.execute('SELECT field, blob_hash FROM contract_bodies WHERE contract_id = ?',
+                            (contract_id,))
+        return {row['field']: row['blob_hash'] for row in rows}
+    
+    def save(self, record: Dict, bodies: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, str]:
+        """Insert or update contract metadata and any changed bodies.
+        
+        Returns the blob hashes of the bodies that were written.
+        """
+        columns = METADATA_COLUMNS
+        updates = ', '.join(f'{col} = excluded.{col}' for col in columns if col != 'id')
+        sql = (f"INSERT INTO contracts ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' for _ in columns)}) "
+               f"ON CONFLICT(id) DO UPDATE SET {updates}")
+        with self._transaction() as conn:
+            conn.execute(sql, [record.get(col) for col in columns])
+            refs = self._write_bodies(conn, record['id'], bodies) if bodies else {}
+            clauses = (bodies or {}).get('extracted_clauses', False)
+            categories = None if clauses is False else _clause_categories(clauses) if clauses else ''
+            self._index_contract(conn, record['id'], record.get('contract_name'), categories)
+        return refs
+    
+    def update_fields(self, contract_id: str, **fields) -> bool:
+        """Update metadata columns of one contract without touching its bodies"""
+        columns = [col for col in fields if col in METADATA_COLUMNS and col != 'id']
+        if not columns:
+            raise ValueError(f"No updatable contract fields in {sorted(fields)}")
+        with self._transaction() as conn:
+            cursor = conn.execute(f"UPDATE contracts SET {', '.join(f'{col} = ?' for col in columns)} WHERE id = ?",
+                                  [fields[col] for col in columns] + [contract_id])
+            if cursor.rowcount and 'contract_name' in columns:
+                self._index_contract(conn, contract_id, fields['contract_name'])
+        return cursor.rowcount > 0
+    
+    def get(self, contract_id: str) -> Optional[sqlite3.Row]:
+        """Fetch contract metadata"""
+        return self._connect().execute(
+            f"SELECT {', '.join(METADATA_COLUMNS)} FROM contracts WHERE id = ?", (contract_id,)
+        ).fetchone()
+    
+    def get_body_refs(self, contract_id: str) -> Dict[str, str]:
+        """Map body field names to blob hashes for a contract"""
+        return self._body_refs(self._connect(), contract_id)
+    
+    def get_blob(self, blob_hash: str) -> Optional[str]:
+        row = self._connect().execute('SELECT data FROM contract_blobs WHERE hash = ?',
+                                      (blob_hash,)).fetchone()
+        return zlib.decompress(row['data']).decode('utf-8') if row else None
+    
+    def delete(self, contract_id: str) -> bool:
+        with self._transaction() as conn:
+            previous = self._body_refs(conn, contract_id)
+            conn.execute('DELETE FROM contract_bodies WHERE contract_id = ?', (contract_id,))
+            conn.execute('DELETE FROM jobs WHERE contract_id = ?', (contract_id,))
+            self._collect_blobs(conn, list(previous.values()))
+            self._unindex(conn, 'contract_id', contract_id)
+            cursor = conn.execute('DELETE FROM contracts WHERE id = ?', (contract_id,))
+        return cursor.rowcount > 0
+    
+    @staticmethod
+    def _filters(status: Optional[str], search: Optional[str]):
+        clauses, params = [], []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if search:
+            clauses.append("contract_name LIKE ? ESCAPE '\\'")
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+    
+    def list(self, status: Optional[str] = None, search: Optional[str] = None,
+             limit: Optional[int] = None) -> List[sqlite3.Row]:
+        """List contract metadata, most recently updated first"""
+        where, params = self._filters(status, search)
+        sql = (f"SELECT {', '.join(METADATA_COLUMNS)} FROM contracts {where} "
+               f"ORDER BY updated_at DESC, id DESC")
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return self._connect().execute(sql, params).fetchall()
+    
+    def list_page(self, status: Optional[str] = None, search: Optional[str] = None, limit: int = 25,
+                  after: Optional[str] = None, before: Optional[str] = None):
+        """Keyset page of contract metadata ordered by (updated_at, id) descending.
+        
+        ``after`` continues past the last row of a page, ``before`` walks back from the
+        first row. Returns ``(rows, has_more)`` where ``has_more`` says whether further
+        rows exist in the direction travelled.
+        """
+        where, params = self._filters(status, search)
+        if after or before:
+            position = decode_cursor(after or before)
+            keyset = '(updated_at, id) < (?, ?)' if after else '(updated_at, id) > (?, ?)'
+            where = f'{where} AND {keyset}' if where else f'WHERE {keyset}'
+            params.extend(position)
+        order = 'ASC' if before else 'DESC'
+        sql = (f"SELECT {', '.join(METADATA_COLUMNS)} FROM contracts {where} "
+               f"ORDER BY updated_at {order}, id {order} LIMIT ?")
+        params.append(limit + 1)
+        rows = self._connect().execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before:
+            rows.reverse()
+        return rows, has_more
+    
+    def count(self, status: Optional[str] = None, search: Optional[str] = None) -> int:
+        if not search:
+            counts = self.status_counts()
+            return counts.get(status, 0) if status else sum(counts.values())
+        where, params = self._filters(status, search)
+        return self._connect().execute(f'SELECT COUNT(*) FROM contracts {where}', params).fetchone()[0]
+    
+    def search(self, search: str, status: Optional[str] = None, limit: int = 25, offset: int = 0):
+        """One page of contracts matching a full-text search, best match first, as
+        ``(results, has_more)`` with ``(metadata, field, snippet)`` results"""
+        query = build_match_query(search)
+        if query is None:
+            return [], False
+        conn = self._connect()
+        columns = ', '.join(f'c.{col}' for col in METADATA_COLUMNS)
+        status_filter = 'AND c.status = ?' if status else ''
+        status_params = [status] if status else []
+        wanted = offset + limit + 1
+        
+        matches = []  # (metadata, field, docid)
+        seen = set()
+        fields = ', '.join('?' for _ in SEARCH_FIELDS)
+        try:
+            hits = conn.execute('SELECT rowid FROM search_index WHERE search_index MATCH ? '
+                                'ORDER BY bm25(search_index, 10.0, 4.0, 1.0), rowid DESC', (query,)).fetchall()
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"Search failed for {search!r}: {str(e)}")
+            return [], False
+        # Expand ranked documents into the contracts using them until the page is full
+        for (docid,) in hits:
+            doc = conn.execute('SELECT contract_id, blob_hash FROM search_docs WHERE docid = ?', (docid,)).fetchone()
+            if doc is None:
+                continue
+            if doc['contract_id'] is not None:
+                rows = conn.execute(f"SELECT {columns}, 'contract' AS field FROM contracts c "
+                                    f"WHERE c.id = ? {status_filter}", [doc['contract_id'], *status_params])
+            elif conn.execute('SELECT COUNT(*) FROM (SELECT 1 FROM contract_bodies WHERE blob_hash = ? LIMIT ?)',
+                              (doc['blob_hash'], SHARED_BODY_REFS)).fetchone()[0] < SHARED_BODY_REFS:
+                rows = conn.execute(
+                    f"SELECT {columns}, b.field FROM contract_bodies b JOIN contracts c ON c.id = b.contract_id "
+                    f"WHERE b.blob_hash = ? AND b.field IN ({fields}) {status_filter} "
+                    f"ORDER BY c.updated_at DESC, c.id DESC", [doc['blob_hash'], *SEARCH_FIELDS, *status_params])
+            else:
+                # CROSS JOIN keeps contracts as the outer loop, read in index order and stopped early
+                rows = conn.execute(
+                    f"SELECT {columns}, b.field FROM contracts c CROSS JOIN contract_bodies b "
+                    f"ON b.contract_id = c.id AND b.field IN ({fields}) AND b.blob_hash = ? "
+                    f"WHERE 1 {status_filter} ORDER BY c.updated_at DESC, c.id DESC",
+                    [*SEARCH_FIELDS, doc['blob_hash'], *status_params])
+            for row in rows:
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                matches.append(({col: row[col] for col in METADATA_COLUMNS}, row['field'], docid))
+                if len(matches) >= wanted:
+                    break
+            if len(matches) >= wanted:
+                break
+        
+        # Snippets only for the documents shown on the page
+        page = matches[offset:offset + limit]
+        snippets = {}
+        for docid in {docid for _, _, docid in page}:
+            row = conn.execute('SELECT snippet(search_index, -1, ?, ?, ?, 24) FROM search_index '
+                               'WHERE search_index MATCH ? AND rowid = ?',
+                               (SNIPPET_START, SNIPPET_END, '…', query, docid)).fetchone()
+            snippets[docid] = row[0] if row else ''
+        results = [(metadata, field, snippets[docid]) for metadata, field, docid in page]
+        return results, len(matches) > offset + limit
+    
+    def status_counts(self) -> Dict[str, int]:
+        """Number of contracts per status, read from the trigger-maintained stats table"""
+        rows = self._connect().execute('SELECT status, count FROM contract_stats WHERE count > 0').fetchall()
+        return {row['status']: row['count'] for row in rows}
+    
+    def create_job(self, job_id: str, contract_id: str, owner: str):
+        now = format_timestamp(datetime.utcnow())
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, contract_id, status, owner, created_at, updated_at) '
+                         "VALUES (?, ?, 'queued', ?, ?, ?)", (job_id, contract_id, owner, now, now))
+    
+    def update_job(self, job_id: str, **fields):
+        """Update job progress fields (status, stage, progress, message)"""
+        fields['updated_at'] = format_timestamp(datetime.utcnow())
+        assignments = ', '.join(f'{col} = ?' for col in fields if col in JOB_COLUMNS)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?',
+                         [value for col, value in fields.items() if col in JOB_COLUMNS] + [job_id])
+    
+    def get_job(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    
+    def get_latest_job(self, contract_id: str) -> Optional[sqlite3.Row]:
+        return self._connect().execute(
+            'SELECT * FROM jobs WHERE contract_id = ? ORDER BY created_at DESC LIMIT 1', (contract_id,)
+        ).fetchone()
+    
+    def list_unfinished_jobs(self) -> List[sqlite3.Row]:
+        return self._connect().execute(
+            "SELECT * FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall()
+    
+    def migrate_json_dir(self, storage_dir: str) -> int:
+        """Import legacy contracts_data/*.json files, skipping ids already stored"""
+        if not os.path.isdir(storage_dir):
+            return 0
+        
+        sql = (f"INSERT OR IGNORE INTO contracts ({', '.join(METADATA_COLUMNS)}) "
+               f"VALUES ({', '.join('?' for _ in METADATA_COLUMNS)})")
+        migrated = 0
+        with self._transaction() as conn:
+            for filename in sorted(os.listdir(storage_dir)):
+                if not filename.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(storage_dir, filename), 'r') as f:
+                        data = json.load(f)
+                    data.setdefault('id', filename[:-5])
+                    for key in ('created_at', 'updated_at'):
+                        data[key] = format_timestamp(parse_timestamp(data.get(key)))
+                except (ValueError, OSError) as e:
+                    self.logger.warning(f"Skipping unreadable contract file {filename}: {str(e)}")
+                    continue
+                cursor = conn.execute(sql, [data.get(col) for col in METADATA_COLUMNS])
+                if cursor.rowcount:
+                    self._write_bodies(conn, data['id'], {field: data.get(field) for field in BODY_FIELDS})
+                    clauses = data.get('extracted_clauses')
+                    self._index_contract(conn, data['id'], data.get('contract_name'),
+                                         _clause_categories(clauses) if clauses else '')
+                    migrated += 1
+        return migrated
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> ContractStore:
+    """Return the process-wide store for the configured database"""
+    global _store
+    from app import app
+    db_path = app.config['CONTRACTS_DB']
+    if _store is None or _store.db_path != db_path:
+        with _store_lock:
+            if _store is None or _store.db_path != db_path:
+                _store = ContractStore(db_path)
+    return _store
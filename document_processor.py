@@ -1,60 +1,130 @@
 import os
 import io
+import shutil
 import logging
+import tempfile
 from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from functools import lru_cache
 from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
 from werkzeug.datastructures import FileStorage
-import PyPDF2
 from app import app
+from pdf_extraction import PdfPageExtractor
+from contract_blocks import ContractBlock, PARAGRAPH
+
+def _escape_markup(text: str, line_breaks: bool = False) -> str:
+    """Escape text for Platypus paragraph markup.
+    
+    Chained str.replace runs in C and measured faster than a single str.translate
+    or regex pass, and skipping clean text avoids copying it at all.
+    """
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text or '>' in text:
+        text = text.replace('<', '&lt;').replace('>', '&gt;')
+    if line_breaks:
+        text = text.replace('\n', '<br/>')
+    return text
+
+@lru_cache(maxsize=None)
+def _pdf_styles() -> dict:
+    """Paragraph styles for generated PDFs, built once per process"""
+    styles = getSampleStyleSheet()
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            alignment=TA_CENTER,
+            fontSize=16,
+            spaceAfter=20
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=12
+        ),
+        'body': ParagraphStyle(
+            'CustomBody',
+            parent=styles['Normal'],
+            alignment=TA_JUSTIFY,
+            fontSize=10,
+            spaceAfter=6
+        ),
+    }
+
+@lru_cache(maxsize=65536)
+def _word_width(word: str, font_name: str, font_size: float) -> float:
+    return stringWidth(word, font_name, font_size)
+
+def _wrap_line(line: str, font_name: str, font_size: float, width: float) -> list:
+    """Greedy word wrap using cached word widths; contracts repeat the same words a lot"""
+    space = _word_width(' ', font_name, font_size)
+    lines, current, current_width = [], [], 0.0
+    for word in line.split():
+        word_width = _word_width(word, font_name, font_size)
+        if current and current_width + space + word_width > width:
+            lines.append(' '.join(current))
+            current, current_width = [word], word_width
+        else:
+            current_width += word_width + (space if current else 0)
+            current.append(word)
+    lines.append(' '.join(current))
+    return lines
 
 class DocumentProcessor:
     """Handles document processing operations"""
     
-    def __init__(self):
+    PDF_LAYOUTS = ('auto', 'platypus', 'fast')
+    
+    def __init__(self, pdf_extractor: Optional[PdfPageExtractor] = None, pdf_layout: str = 'auto',
+                 fast_layout_min_chars: int = 250000):
         self.logger = logging.getLogger(__name__)
+        if pdf_layout not in self.PDF_LAYOUTS:
+            raise ValueError(f"Unknown PDF layout: {pdf_layout}")
+        self.pdf_extractor = pdf_extractor or PdfPageExtractor(max_workers=0)
+        self.pdf_layout = pdf_layout
+        self.fast_layout_min_chars = fast_layout_min_chars
     
     def extract_text_from_file(self, file: FileStorage) -> str:
         """Extract text content from uploaded file"""
+        separator = '\n' if file.filename.lower().endswith('.docx') else ''
+        return separator.join(list(self.iter_text_from_file(file)))
+    
+    def iter_text_from_file(self, file: FileStorage) -> Iterator[str]:
+        """Yield text of an uploaded file line by line (TXT), paragraph by paragraph (DOCX) or page by page (PDF)"""
         try:
             filename = file.filename.lower()
             
             if filename.endswith('.txt'):
-                return file.read().decode('utf-8')
+                # Decode incrementally, keeping line endings so the joined text is unchanged
+                reader = io.TextIOWrapper(self._seekable_stream(file), encoding='utf-8', newline='')
+                try:
+                    yield from reader
+                finally:
+                    reader.detach()
             
             elif filename.endswith('.docx'):
-                # Save file temporarily
-                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{datetime.now().timestamp()}.docx")
-                file.save(temp_path)
-                
-                # Extract text from docx
-                doc = Document(temp_path)
-                text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-                
-                # Clean up temp file
-                os.remove(temp_path)
-                return text
+                # python-docx reads the zip straight from the stream
+                doc = Document(self._seekable_stream(file))
+                for paragraph in doc.paragraphs:
+                    yield paragraph.text
             
             elif filename.endswith('.pdf'):
-                # Save file temporarily
-                temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{datetime.now().timestamp()}.pdf")
-                file.save(temp_path)
-                
-                # Extract text from PDF
-                text = ""
-                with open(temp_path, 'rb') as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text()
-                
-                # Clean up temp file
-                os.remove(temp_path)
-                return text
+                # Pages come back in order, from worker processes for large files
+                for page in self.pdf_extractor.iter_pages(self._seekable_stream(file).read()):
+                    yield page.text
             
             else:
                 raise ValueError(f"Unsupported file type: {filename}")
@@ -63,46 +133,80 @@ class DocumentProcessor:
             self.logger.error(f"Error extracting text from file: {str(e)}")
             raise
     
+    @staticmethod
+    def _seekable_stream(file: FileStorage):
+        """Return the upload stream, spooling it into memory first if it cannot seek"""
+        stream = file.stream
+        if getattr(stream, 'seekable', lambda: False)():
+            stream.seek(0)
+            return stream
+        spooled = tempfile.SpooledTemporaryFile(max_size=app.config['MAX_CONTENT_LENGTH'])
+        shutil.copyfileobj(stream, spooled)
+        spooled.seek(0)
+        return spooled
+    
     def merge_documents(self, document_contents: dict, extracted_clauses: dict) -> str:
         """Merge fixture recap, base CP, and negotiated clauses into final contract"""
+        return ''.join(self.iter_merged_segments(document_contents, extracted_clauses))
+    
+    def write_merged_document(self, document_contents: dict, extracted_clauses: dict, sink) -> int:
+        """Stream the merged contract into a file path or text file object, returning its length.
         
-        # Start with base CP if available, otherwise start fresh
-        final_contract = document_contents.get('base_cp', '')
+        Segments are written as they are produced, so beyond the inputs themselves
+        no copy of the whole contract is ever held in memory.
+        """
+        if isinstance(sink, (str, os.PathLike)):
+            with open(sink, 'w', encoding='utf-8') as f:
+                return self.write_merged_document(document_contents, extracted_clauses, f)
+        length = 0
+        for segment in self.iter_merged_segments(document_contents, extracted_clauses):
+            length += sink.write(segment)
+        return length
+    
+    def merge_documents_with_offsets(self, document_contents: dict, extracted_clauses: dict) -> Tuple[str, Dict[str, int]]:
+        """Merge the documents, also returning where each source document starts in the result"""
+        segments = []
+        offsets = {}
+        length = 0
+        for source, segment in self._iter_source_segments(document_contents, extracted_clauses):
+            if source:
+                offsets[source] = length
+            segments.append(segment)
+            length += len(segment)
+        return ''.join(segments), offsets
+    
+    def iter_merged_segments(self, document_contents: dict, extracted_clauses: dict) -> Iterator[str]:
+        """Yield the final contract piece by piece; document texts are yielded as-is, never copied"""
+        for _, segment in self._iter_source_segments(document_contents, extracted_clauses):
+            yield segment
+    
+    def _iter_source_segments(self, document_contents: dict, extracted_clauses: dict) -> Iterator[Tuple[Optional[str], str]]:
+        """Yield (document type, segment) pairs, with None as the type of generated text"""
         
-        # Add fixture recap information
+        # Add fixture recap information ahead of the base CP
         if document_contents.get('fixture_recap'):
-            fixture_section = f"""
-=== FIXTURE RECAP ===
-
-{document_contents['fixture_recap']}
-
-"""
-            final_contract = fixture_section + final_contract
+            yield None, "\n=== FIXTURE RECAP ===\n\n"
+            yield 'fixture_recap', document_contents['fixture_recap']
+            yield None, "\n\n"
+        
+        # Continue with base CP if available
+        yield 'base_cp', document_contents.get('base_cp') or ''
         
         # Process and integrate negotiated clauses
         if document_contents.get('negotiated_clauses'):
-            negotiated_section = f"""
-
-=== NEGOTIATED CLAUSES ===
-
-{document_contents['negotiated_clauses']}
-
-"""
-            final_contract += negotiated_section
+            yield None, "\n\n=== NEGOTIATED CLAUSES ===\n\n"
+            yield 'negotiated_clauses', document_contents['negotiated_clauses']
+            yield None, "\n\n"
         
         # Add extracted clauses summary
         if extracted_clauses:
-            clauses_summary = self._format_extracted_clauses(extracted_clauses)
-            final_contract += f"""
-
-=== EXTRACTED CLAUSES SUMMARY ===
-
-{clauses_summary}
-
-"""
+            yield None, "\n\n=== EXTRACTED CLAUSES SUMMARY ===\n\n"
+            for line in self._iter_extracted_clause_lines(extracted_clauses):
+                yield None, line
+            yield None, "\n\n"
         
         # Add contract footer
-        final_contract += f"""
+        yield None, f"""
 
 === CONTRACT GENERATED ===
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -110,43 +214,26 @@ By: Smart CP Generator - Contract Automation System
 
 This document combines the provided fixture recap, base charter party agreement, and negotiated clauses into a unified contract document. Please review all terms carefully before execution.
 """
-        
-        return final_contract
     
-    def _format_extracted_clauses(self, extracted_clauses: dict) -> str:
-        """Format extracted clauses for display"""
-        formatted = ""
-        
+    def _iter_extracted_clause_lines(self, extracted_clauses: dict) -> Iterator[str]:
         for category, clauses in extracted_clauses.items():
             if clauses:
-                formatted += f"\n{category.upper()}:\n"
+                yield f"\n{category.upper()}:\n"
                 for i, clause in enumerate(clauses, 1):
-                    formatted += f"{i}. {clause}\n"
-                formatted += "\n"
-        
-        return formatted
+                    yield f"{i}. {clause}\n"
+                yield "\n"
     
-    def generate_output_files(self, content: str, contract_id: int, contract_name: str) -> tuple:
-        """Generate Word and PDF files from contract content"""
-        
-        # Generate safe filename
-        safe_name = "".join(c for c in contract_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        # Generate DOCX file
-        docx_filename = f"{safe_name}_{timestamp}.docx"
-        docx_path = os.path.join(app.config['GENERATED_FOLDER'], docx_filename)
-        self._create_docx(content, docx_path, contract_name)
-        
-        # Generate PDF file
-        pdf_filename = f"{safe_name}_{timestamp}.pdf"
-        pdf_path = os.path.join(app.config['GENERATED_FOLDER'], pdf_filename)
-        self._create_pdf(content, pdf_path, contract_name)
-        
-        return docx_path, pdf_path
+    def render_file(self, blocks: List[ContractBlock], file_type: str, file_path: str, title: str):
+        """Render parsed contract blocks to a Word or PDF file"""
+        if file_type == 'docx':
+            self._create_docx(blocks, file_path, title)
+        elif file_type == 'pdf':
+            self._create_pdf(blocks, file_path, title)
+        else:
+            raise ValueError(f"Unsupported output format: {file_type}")
     
-    def _create_docx(self, content: str, file_path: str, title: str):
-        """Create Word document from content"""
+    def _create_docx(self, blocks: List[ContractBlock], file_path: str, title: str):
+        """Create Word document from contract blocks"""
         doc = Document()
         
         # Add title
@@ -157,92 +244,93 @@ This document combines the provided fixture recap, base charter party agreement,
         doc.add_paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
         doc.add_paragraph("")  # Empty line
         
-        # Split content into sections and paragraphs
-        sections = content.split('===')
-        
-        for section in sections:
-            section = section.strip()
-            if not section:
-                continue
-                
-            # Check if this is a section header
-            if section.isupper() and len(section) < 50:
-                doc.add_heading(section, level=1)
+        # Section headers become level 1 headings, subsection headers level 2
+        for level, text, _ in blocks:
+            if level == PARAGRAPH:
+                doc.add_paragraph(text)
             else:
-                # Split into paragraphs
-                paragraphs = section.split('\n\n')
-                for para in paragraphs:
-                    para = para.strip()
-                    if para:
-                        # Check if it's a subsection header
-                        if para.isupper() and len(para) < 100:
-                            doc.add_heading(para, level=2)
-                        else:
-                            doc.add_paragraph(para)
+                doc.add_heading(text, level=level)
         
         doc.save(file_path)
     
-    def _create_pdf(self, content: str, file_path: str, title: str):
-        """Create PDF document from content"""
-        doc = SimpleDocTemplate(file_path, pagesize=letter)
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            alignment=TA_CENTER,
-            fontSize=16,
-            spaceAfter=20
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=12
-        )
+    def _create_pdf(self, blocks: List[ContractBlock], file_path: str, title: str):
+        """Create PDF document from contract blocks"""
+        if self.pdf_layout == 'fast' or (self.pdf_layout == 'auto' and
+                                         sum(len(block.text) for block in blocks) >= self.fast_layout_min_chars):
+            return self._create_pdf_fast(blocks, file_path, title)
         
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            alignment=TA_JUSTIFY,
-            fontSize=10,
-            spaceAfter=6
-        )
+        doc = SimpleDocTemplate(file_path, pagesize=letter)
+        styles = _pdf_styles()
         
         # Build content
         story = []
         
         # Add title
-        story.append(Paragraph(title, title_style))
-        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
+        story.append(Paragraph(_escape_markup(title), styles['title']))
+        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['normal']))
         story.append(Spacer(1, 20))
         
         # Process content sections
-        sections = content.split('===')
-        
-        for section in sections:
-            section = section.strip()
-            if not section:
-                continue
-            
-            # Check if this is a section header
-            if section.isupper() and len(section) < 50:
-                story.append(Paragraph(section, heading_style))
+        for level, text, _ in blocks:
+            if level:
+                story.append(Paragraph(_escape_markup(text), styles['heading']))
             else:
-                # Split into paragraphs
-                paragraphs = section.split('\n\n')
-                for para in paragraphs:
-                    para = para.strip()
-                    if para:
-                        if para.isupper() and len(para) < 100:
-                            story.append(Paragraph(para, heading_style))
-                        else:
-                            # Escape HTML characters and preserve line breaks
-                            para = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                            para = para.replace('\n', '<br/>')
-                            story.append(Paragraph(para, body_style))
+                # Escape HTML characters and preserve line breaks
+                story.append(Paragraph(_escape_markup(text, line_breaks=True), styles['body']))
         
         doc.build(story)
+    
+    def _create_pdf_fast(self, blocks: List[ContractBlock], file_path: str, title: str):
+        """Create PDF document by drawing wrapped lines straight onto the canvas.
+        
+        Skips Platypus paragraph layout, which dominates render time on long
+        contracts; body text is left aligned instead of justified.
+        """
+        styles = _pdf_styles()
+        pdf = canvas.Canvas(file_path, pagesize=letter)
+        left, width = inch, letter[0] - 2 * inch
+        top, bottom = letter[1] - inch, inch
+        y = top
+        
+        def draw(lines, style, centered=False):
+            nonlocal y
+            if y != top:
+                y -= style.spaceBefore
+            while lines:
+                fit = int((y - bottom) // style.leading)
+                if fit <= 0:
+                    pdf.showPage()
+                    y = top
+                    continue
+                page_lines, lines = lines[:fit], lines[fit:]
+                if centered:
+                    pdf.setFont(style.fontName, style.fontSize)
+                    for i, line in enumerate(page_lines, 1):
+                        pdf.drawCentredString(left + width / 2, y - i * style.leading, line)
+                else:
+                    # One text object per page run keeps the content stream small
+                    text = pdf.beginText(left, y - style.leading)
+                    text.setFont(style.fontName, style.fontSize, style.leading)
+                    for line in page_lines:
+                        text.textLine(line)
+                    pdf.drawText(text)
+                y -= style.leading * len(page_lines)
+            y -= style.spaceAfter
+        
+        def wrap(text, style):
+            lines = []
+            for line in text.split('\n'):
+                lines.extend(_wrap_line(line, style.fontName, style.fontSize, width))
+            return lines
+        
+        draw(wrap(title, styles['title']), styles['title'], centered=True)
+        draw([f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"], styles['normal'])
+        y -= 20
+        
+        for level, text, _ in blocks:
+            if level:
+                draw(wrap(' '.join(text.split()), styles['heading']), styles['heading'])
+            else:
+                draw(wrap(text, styles['body']), styles['body'])
+        
+        pdf.save()
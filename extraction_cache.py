@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_cache (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extraction_cache_lru ON extraction_cache (last_used);
+CREATE TABLE IF NOT EXISTS extraction_cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO extraction_cache_stats (id) VALUES (1);
+"""
+
+class ExtractionCache:
+    """Persistent LRU cache of per-document clause extraction results.
+    
+    Entries are keyed by a hash of the document text and a namespace describing
+    everything else the result depends on (model, pipeline profile, patterns), so a
+    base charter party reused across fixtures is only parsed once. The cache lives in
+    its own SQLite file and is shared by every worker process.
+    """
+    
+    def __init__(self, db_path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    # Caches only speed things up; a locked or corrupt cache file must never fail an upload
+    def _safely(self, operation, default=None):
+        try:
+            return operation()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Extraction cache unavailable: {str(e)}")
+            return default
+    
+    @staticmethod
+    def make_key(namespace: str, content: str) -> str:
+        return hashlib.sha256(f'{namespace}\0{content}'.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[list]]:
+        def lookup():
+            with self._connect() as conn:
+                row = conn.execute('SELECT data FROM extraction_cache WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    conn.execute('UPDATE extraction_cache_stats SET misses = misses + 1 WHERE id = 1')
+                    return None
+                conn.execute('UPDATE extraction_cache SET last_used = ? WHERE key = ?', (time.time(), key))
+                conn.execute('UPDATE extraction_cache_stats SET hits = hits + 1 WHERE id = 1')
+            return json.loads(zlib.decompress(row[0]))
+        return self._safely(lookup)
+    
+    def put(self, key: str, value: List[list]):
+        data = zlib.compress(json.dumps(value).encode('utf-8'))
+        
+        def store():
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO extraction_cache (key, size, last_used, data) '
+                             'VALUES (?, ?, ?, ?)', (key, len(data), time.time(), data))
+                self._evict(conn)
+        self._safely(store)
+    
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM extraction_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM extraction_cache ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM extraction_cache WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        conn.execute('UPDATE extraction_cache_stats SET evictions = evictions + ? WHERE id = 1', (evicted,))
+    
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        hits, misses, evictions = conn.execute(
+            'SELECT hits, misses, evictions FROM extraction_cache_stats WHERE id = 1'
+        ).fetchone()
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache').fetchone()
+        return {'hits': hits, 'misses': misses, 'evictions': evictions, 'entries': entries, 'bytes': size}
+    
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM extraction_cache')
+            conn.execute('UPDATE extraction_cache_stats SET hits = 0, misses = 0, evictions = 0 WHERE id = 1')
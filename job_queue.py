@@ -0,0 +1,104 @@
+import os
+import uuid
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from contract_store import get_store
+from models import Contract
+
+def _process_started(pid: int) -> str:
+    """Start time of a process in clock ticks since boot, '' where /proc is not available"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # The command name in parentheses may contain spaces, the fields after it don't
+            return f.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        return ''
+
+def _owner_id() -> str:
+    # The start time tells a restarted process apart from an earlier one that had the same pid
+    return f"{socket.gethostname()}:{os.getpid()}:{_process_started(os.getpid())}"
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process that queued a job on this host is still running"""
+    if not owner:
+        return False
+    host, pid, started = (owner.split(':') + [''])[:3]
+    if host != socket.gethostname():
+        return True  # Can't tell for other hosts, leave their jobs alone
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    # A live pid may still be a different process, unless its start time matches
+    return not started or _process_started(int(pid)) == started
+
+class JobQueue:
+    """In-process background job runner with progress persisted in the contract store.
+    
+    Jobs run on a local thread pool, so no external broker is needed. Each gunicorn
+    worker owns its own pool; progress lives in SQLite so any worker can report it.
+    With ``max_workers=0`` jobs run inline, which is handy for the CLI and debugging.
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self._executor = None
+        # Jobs left behind by a worker that died must not wait for the next upload to be failed
+        self.recover_interrupted()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created lazily so the pool's threads belong to the forked worker, not the master
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='contract-job')
+        return self._executor
+    
+    def submit(self, contract_id: str, func: Callable, *args) -> str:
+        """Queue ``func(contract_id, *args, report=...)`` and return the job id"""
+        job_id = str(uuid.uuid4())
+        get_store().create_job(job_id, contract_id, _owner_id())
+        if self.max_workers > 0:
+            self.executor.submit(self._run, job_id, contract_id, func, args)
+        else:
+            self._run(job_id, contract_id, func, args)
+        return job_id
+    
+    def _run(self, job_id: str, contract_id: str, func: Callable, args: tuple):
+        store = get_store()
+        
+        def report(stage: str, progress: int, message: str):
+            store.update_job(job_id, status='running', stage=stage, progress=progress, message=message)
+        
+        try:
+            func(contract_id, *args, report=report)
+            store.update_job(job_id, status='completed', stage='done', progress=100,
+                             message='Contract processed successfully')
+        except Exception as e:
+            self.logger.error(f'Contract processing error: {str(e)}')
+            store.update_job(job_id, status='error', message=str(e))
+            self._mark_contract_failed(contract_id)
+    
+    @staticmethod
+    def _mark_contract_failed(contract_id: str):
+        contract = Contract.load(contract_id)
+        if contract:
+            contract.update_status('error')
+    
+    def recover_interrupted(self):
+        """Fail jobs whose worker process died before finishing them; run at startup only"""
+        store = get_store()
+        # Nothing was queued here yet, so jobs under this pid belong to an earlier process,
+        # e.g. of a restarted container whose workers get the same small pids again
+        reused = [socket.gethostname(), str(os.getpid())]
+        for job in store.list_unfinished_jobs():
+            owner = job['owner'] or ''
+            if owner.split(':')[:2] == reused or not _owner_alive(owner):
+                self.logger.warning(f"Job {job['id']} was interrupted, marking contract {job['contract_id']} as failed")
+                store.update_job(job['id'], status='error', message='Processing was interrupted, please upload again')
+                self._mark_contract_failed(job['contract_id'])
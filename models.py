@@ -1,19 +1,62 @@
-import os
-import json
 import uuid
 from datetime import datetime
-from dataclasses import dataclass, asdict
-from typing import Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from contract_blocks import ContractBlock, load_blocks, parse_contract_blocks
+from contract_clauses import ClauseSet, resolve_clauses
+from contract_store import METADATA_COLUMNS, encode_cursor, format_timestamp, parse_timestamp, get_store, load_json
+
+class LazyBody:
+    """Descriptor for document bodies that are fetched from the blob store on first access"""
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return None  # Field default for the dataclass
+        bodies = obj.__dict__['_bodies']
+        if self.name not in bodies:
+            if obj._body_refs is None:
+                obj._body_refs = get_store().get_body_refs(obj.id)
+            blob_hash = obj._body_refs.get(self.name)
+            bodies[self.name] = get_store().get_blob(blob_hash) if blob_hash else None
+        return bodies[self.name]
+    
+    def __set__(self, obj, value):
+        obj.__dict__.setdefault('_bodies', {})[self.name] = value
+        obj.__dict__.setdefault('_dirty_bodies', set()).add(self.name)
+
+@lru_cache(maxsize=32)
+def _parse_body(blob_hash: str, kind: str):
+    """Parse a body blob once per version; blobs are content-addressed, so the hash is the version"""
+    text = get_store().get_blob(blob_hash)
+    if kind == 'blocks':
+        return tuple(load_blocks(text))
+    if kind == 'text':
+        return tuple(parse_contract_blocks(text))
+    if kind == 'clauses':
+        return ClauseSet.load(text)
+    return load_json(text)
+
+@lru_cache(maxsize=32)
+def _resolve_clauses(clauses_hash: str, sources: Tuple[Tuple[str, Optional[str]], ...]) -> dict:
+    """Clause texts by category, resolved from the (source, blob hash) documents they point into"""
+    contents = {source: get_store().get_blob(blob_hash) if blob_hash else '' for source, blob_hash in sources}
+    return resolve_clauses(_parse_body(clauses_hash, 'clauses').spans, contents)
 
 @dataclass
 class Contract:
     """Data class for storing contract processing records"""
     contract_name: str
-    fixture_recap_content: Optional[str] = None
-    base_cp_content: Optional[str] = None
-    negotiated_clauses_content: Optional[str] = None
-    final_contract_content: Optional[str] = None
-    extracted_clauses: Optional[str] = None  # JSON string of extracted clauses
+    fixture_recap_content: Optional[str] = LazyBody()
+    base_cp_content: Optional[str] = LazyBody()
+    negotiated_clauses_content: Optional[str] = LazyBody()
+    final_contract_content: Optional[str] = LazyBody()
+    extracted_clauses: Optional[str] = LazyBody()  # JSON ClauseSet of clause spans in the documents
+    document_blocks: Optional[str] = LazyBody()  # JSON list of [level, text, start] blocks of the final contract
+    stage_keys: Optional[str] = LazyBody()  # JSON StageKeys of the pipeline inputs the above were built from
     status: str = 'draft'  # draft, processing, completed, error
     docx_path: Optional[str] = None
     pdf_path: Optional[str] = None
@@ -28,6 +71,8 @@ class Contract:
             self.created_at = datetime.utcnow()
         if self.updated_at is None:
             self.updated_at = datetime.utcnow()
+        # A new contract has nothing in the blob store yet
+        self._body_refs = {}
     
     def __repr__(self):
         return f'<Contract {self.contract_name}>'
@@ -39,66 +84,158 @@ class Contract:
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'has_docx': bool(self.docx_path),
-            'has_pdf': bool(self.pdf_path)
+            # Files are rendered on demand once the contract is complete
+            'has_docx': self.status == 'completed' or bool(self.docx_path),
+            'has_pdf': self.status == 'completed' or bool(self.pdf_path)
         }
     
     def save(self):
-        """Save contract to file storage"""
-        from app import app
+        """Save contract to the contract store"""
         self.updated_at = datetime.utcnow()
-        storage_path = os.path.join(app.config['CONTRACTS_STORAGE'], f'{self.id}.json')
-        contract_data = asdict(self)
-        # Convert datetime objects to strings for JSON serialization
-        contract_data['created_at'] = self.created_at.isoformat() if self.created_at else None
-        contract_data['updated_at'] = self.updated_at.isoformat() if self.updated_at else None
+        contract_data = {column: getattr(self, column) for column in METADATA_COLUMNS}
+        # Convert datetime objects to strings for storage
+        contract_data['created_at'] = format_timestamp(self.created_at)
+        contract_data['updated_at'] = format_timestamp(self.updated_at)
         
-        with open(storage_path, 'w') as f:
-            json.dump(contract_data, f, indent=2)
+        # Only bodies assigned since the last save are written; unread bodies stay untouched
+        bodies = {name: self._bodies[name] for name in self._dirty_bodies}
+        refs = get_store().save(contract_data, bodies)
+        if self._body_refs is not None:
+            for name in bodies:
+                self._body_refs.pop(name, None)
+            self._body_refs.update(refs)
+        self._dirty_bodies.clear()
+    
+    def body_version(self, field: str) -> Optional[str]:
+        """Version of a saved body field (its blob hash), without loading the body"""
+        if self._body_refs is None:
+            self._body_refs = get_store().get_body_refs(self.id)
+        return self._body_refs.get(field)
+    
+    def document_version(self) -> Optional[str]:
+        """Version of the final contract, from the body references alone"""
+        return self.body_version('document_blocks') or self.body_version('final_contract_content')
+    
+    def get_blocks(self) -> Tuple[Optional[str], Tuple[ContractBlock, ...]]:
+        """Version and parsed blocks of the final contract, cached per version"""
+        version = self.body_version('document_blocks')
+        if version:
+            return version, _parse_body(version, 'blocks')
+        # Contracts saved before blocks were stored are parsed from their text
+        version = self.body_version('final_contract_content')
+        if version:
+            return version, _parse_body(version, 'text')
+        return None, ()
+    
+    def get_clause_set(self) -> Optional[ClauseSet]:
+        """Extracted clause spans, cached per version; None if there are none or they predate spans"""
+        version = self.body_version('extracted_clauses')
+        return _parse_body(version, 'clauses') if version else None
+    
+    def get_clauses(self) -> dict:
+        """Extracted clause texts by category, cached per version"""
+        version = self.body_version('extracted_clauses')
+        if not version:
+            return {}
+        clause_set = _parse_body(version, 'clauses')
+        if clause_set is None:
+            # Stored before clauses were kept as spans: the texts themselves
+            return _parse_body(version, 'json')
+        sources = tuple((source, self.body_version(f'{source}_content'))
+                        for source in sorted({span.source for span in clause_set.spans}))
+        return _resolve_clauses(version, sources)
+    
+    def update_status(self, status: str):
+        """Change only the status, leaving metadata and bodies saved by others untouched"""
+        self.status = status
+        self.updated_at = datetime.utcnow()
+        get_store().update_fields(self.id, status=status, updated_at=format_timestamp(self.updated_at))
+    
+    def delete(self):
+        """Remove contract from the contract store"""
+        return get_store().delete(self.id)
     
     @classmethod
-    def load(cls, contract_id: str):
-        """Load contract from file storage"""
-        from app import app
-        storage_path = os.path.join(app.config['CONTRACTS_STORAGE'], f'{contract_id}.json')
-        if not os.path.exists(storage_path):
-            return None
-        
-        with open(storage_path, 'r') as f:
-            contract_data = json.load(f)
+    def _from_row(cls, row):
+        """Build a contract from store metadata, leaving bodies to load lazily"""
+        contract_data = dict(row)
         
         # Convert string dates back to datetime objects
-        if contract_data['created_at']:
-            contract_data['created_at'] = datetime.fromisoformat(contract_data['created_at'])
-        if contract_data['updated_at']:
-            contract_data['updated_at'] = datetime.fromisoformat(contract_data['updated_at'])
+        contract_data['created_at'] = parse_timestamp(contract_data['created_at'])
+        contract_data['updated_at'] = parse_timestamp(contract_data['updated_at'])
         
-        return cls(**contract_data)
+        contract = cls(**contract_data)
+        contract._bodies.clear()
+        contract._dirty_bodies.clear()
+        contract._body_refs = None
+        return contract
     
     @classmethod
-    def get_all(cls):
-        """Get all contracts from file storage"""
-        from app import app
-        contracts = []
-        storage_dir = app.config['CONTRACTS_STORAGE']
-        
-        if os.path.exists(storage_dir):
-            for filename in os.listdir(storage_dir):
-                if filename.endswith('.json'):
-                    contract_id = filename[:-5]  # Remove .json extension
-                    contract = cls.load(contract_id)
-                    if contract:
-                        contracts.append(contract)
-        
-        # Sort by updated_at descending
-        contracts.sort(key=lambda x: x.updated_at if x.updated_at else datetime.min, reverse=True)
-        return contracts
+    def load(cls, contract_id: str):
+        """Load contract metadata from the contract store"""
+        row = get_store().get(contract_id)
+        if row is None:
+            return None
+        return cls._from_row(row)
+    
+    @classmethod
+    def get_all(cls, status=None, search=None, limit=None):
+        """Get contract metadata, most recently updated first"""
+        return [cls._from_row(row) for row in get_store().list(status=status, search=search, limit=limit)]
+    
+    @classmethod
+    def get_page(cls, status=None, search=None, per_page=25, after=None, before=None):
+        """Get one keyset page of contract metadata, most recently updated first"""
+        rows, has_more = get_store().list_page(status=status, search=search, limit=per_page,
+                                               after=after, before=before)
+        cursors = [encode_cursor(row['updated_at'], row['id']) for row in rows]
+        return ContractPage(
+            items=[cls._from_row(row) for row in rows],
+            has_prev=bool(rows) and (has_more if before else bool(after)),
+            has_next=bool(rows) and (bool(before) or has_more),
+            prev_cursor=cursors[0] if cursors else None,
+            next_cursor=cursors[-1] if cursors else None
+        )
+    
+    @classmethod
+    def search(cls, query, status=None, per_page=25, page=1):
+        """Get one page of contracts matching a full-text query, best match first"""
+        results, has_more = get_store().search(query, status=status, limit=per_page, offset=(page - 1) * per_page)
+        return ContractPage(
+            items=[cls._from_row(row) for row, _, _ in results],
+            has_prev=page > 1,
+            has_next=has_more,
+            page=page,
+            matches={row['id']: SearchMatch(field, snippet) for row, field, snippet in results}
+        )
     
     @classmethod
     def count_by_status(cls, status=None):
         """Count contracts by status"""
-        contracts = cls.get_all()
-        if status:
-            return len([c for c in contracts if c.status == status])
-        return len(contracts)
+        return get_store().count(status=status)
+    
+    @classmethod
+    def status_counts(cls):
+        """Number of contracts per status"""
+        return get_store().status_counts()
 
+@dataclass
+class SearchMatch:
+    """Where a search matched a contract, with a snippet of the matching text"""
+    field: str
+    snippet: str
+
+@dataclass
+class ContractPage:
+    """One page of contracts with keyset cursors for the neighbouring pages.
+    
+    Search results are ranked rather than keyset ordered, so they carry a page number
+    instead of cursors, plus the match for each contract id.
+    """
+    items: List[Contract]
+    has_prev: bool
+    has_next: bool
+    prev_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+    page: Optional[int] = None
+    matches: Dict[str, SearchMatch] = field(default_factory=dict)
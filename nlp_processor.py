@@ -1,25 +1,269 @@
+import json
+import hashlib
 import logging
 import re
-from typing import Dict, List
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import spacy
-from spacy.matcher import Matcher
+from spacy.matcher import Matcher, PhraseMatcher
+from contract_clauses import ClauseSpan, resolve_clauses, strip_offsets
+from worker_pool import SpawnedPool
+
+# Pipeline components to drop per profile. Clause extraction only needs tokens for the
+# Matcher, sentence boundaries and (optionally) NER, so the fast profiles replace the
+# dependency parser with the much cheaper senter and skip tagging and lemmatization.
+PIPELINE_PROFILES = {
+    'full': [],
+    'fast': ['parser', 'tagger', 'attribute_ruler', 'lemmatizer'],
+    'fast_no_ner': ['parser', 'tagger', 'attribute_ruler', 'lemmatizer', 'ner'],
+}
+
+def load_pipeline(model: str = "en_core_web_sm", profile: str = 'full'):
+    """Load a spaCy pipeline trimmed to the given profile"""
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown NLP pipeline profile: {profile}")
+    excluded = PIPELINE_PROFILES[profile]
+    nlp = spacy.load(model, exclude=excluded)
+    
+    if 'parser' in excluded:
+        if 'senter' in nlp.disabled:
+            nlp.enable_pipe('senter')
+        elif not any(name in nlp.pipe_names for name in ('senter', 'sentencizer')):
+            nlp.add_pipe('sentencizer', first=True)
+    
+    # Drop the shared tok2vec once nothing listens to it any more
+    if 'tok2vec' in nlp.pipe_names and not getattr(nlp.get_pipe('tok2vec'), 'listening_components', True):
+        nlp.remove_pipe('tok2vec')
+    return nlp
+
+# Regex clause patterns as (category, head, anchors). Every head is scanned for in a single
+# pass over the document. A hit then runs to the first occurrence of each anchor in turn,
+# which is what the lazy ".*?" spans of the original patterns did; the default anchor is a
+# clause terminator. Anchor positions are found once per document, and each step may span
+# at most MAX_CLAUSE_CHARS, so text without terminators can't make extraction quadratic.
+TERMINATOR = r'[.;]'
+
+REGEX_CLAUSE_PATTERNS = [
+    # Payment terms patterns
+    ('payment_terms', r'freight\s+', ('payable', TERMINATOR)),
+    ('payment_terms', r'demurrage\s+', (TERMINATOR,)),
+    ('payment_terms', r'payment\s+', (TERMINATOR,)),
+    
+    # Laytime patterns
+    ('laytime_clauses', r'laytime\s+', (TERMINATOR,)),
+    ('laytime_clauses', r'loading\s+time\s+', (TERMINATOR,)),
+    ('laytime_clauses', r'discharging\s+time\s+', (TERMINATOR,)),
+    
+    # Cargo patterns
+    ('cargo_specifications', r'\d+\s*(?:mt|tons?|tonnes?)\s+', (TERMINATOR,)),
+    ('cargo_specifications', r'cargo\s+', (TERMINATOR,)),
+    ('cargo_specifications', r'quantity\s+', (TERMINATOR,)),
+    
+    # Port patterns
+    ('port_clauses', r'port\s+of\s+', (TERMINATOR,)),
+    ('port_clauses', r'berth\s+', (TERMINATOR,)),
+    ('port_clauses', r'terminal\s+', (TERMINATOR,)),
+    
+    # General terms patterns
+    ('general_terms', r'force\s+majeure\s+', (TERMINATOR,)),
+    ('general_terms', r'arbitration\s+', (TERMINATOR,)),
+    ('general_terms', r'governing\s+law\s+', (TERMINATOR,)),
+]
+
+MAX_CLAUSE_CHARS = 2000
+
+class RegexClauseEngine:
+    """Precompiled single-pass matcher for REGEX_CLAUSE_PATTERNS"""
+    
+    def __init__(self, patterns=REGEX_CLAUSE_PATTERNS, max_clause_chars: int = MAX_CLAUSE_CHARS):
+        self.max_clause_chars = max_clause_chars
+        self.categories = [category for category, _, _ in patterns]
+        self.pattern_anchors = [anchors for _, _, anchors in patterns]
+        anchors = list(dict.fromkeys(anchor for _, _, pattern_anchors in patterns for anchor in pattern_anchors))
+        
+        # Documents are scanned lower-cased, which lets re use its fast prefix search on an
+        # ungrouped alternation; the IGNORECASE set covers text whose length lower() changes
+        self.compiled = {}
+        for flags in (0, re.IGNORECASE):
+            self.compiled[flags] = (
+                re.compile('|'.join(head for _, head, _ in patterns), flags),
+                [re.compile(head, flags) for _, head, _ in patterns],
+                {anchor: re.compile(anchor, flags) for anchor in anchors}
+            )
+    
+    def extract(self, content: str) -> Dict[str, List[str]]:
+        extracted = {category: [] for category in dict.fromkeys(self.categories)}
+        for start, end, category in self.extract_spans(content):
+            extracted[category].append(content[start:end])
+        return extracted
+    
+    def extract_spans(self, content: str) -> List[Tuple[int, int, str]]:
+        """(start, end, category) of each clause, stripped of surrounding whitespace"""
+        text = content.lower()
+        if len(text) != len(content):
+            text = content
+            scanner, heads, anchors = self.compiled[re.IGNORECASE]
+        else:
+            scanner, heads, anchors = self.compiled[0]
+        anchor_positions = {}
+        
+        def seek(anchor: str, position: int):
+            """End of the first anchor match starting at or after position, within bounds"""
+            if anchor not in anchor_positions:
+                anchor_positions[anchor] = [(m.start(), m.end()) for m in anchors[anchor].finditer(text)]
+            occurrences = anchor_positions[anchor]
+            index = bisect_left(occurrences, (position,))
+            if index == len(occurrences) or occurrences[index][0] - position > self.max_clause_chars:
+                return None
+            return occurrences[index][1]
+        
+        # Matches are kept per pattern and never overlap another match of the same
+        # pattern, which mirrors running re.findall once per pattern
+        found = [[] for _ in heads]
+        resume_at = [0] * len(heads)
+        for hit in scanner.finditer(text):
+            start = hit.start()
+            # The first head that matches here is the alternative the scanner took
+            index = next(i for i, head in enumerate(heads) if head.match(text, start))
+            if start < resume_at[index]:
+                continue
+            end = hit.end()
+            for anchor in self.pattern_anchors[index]:
+                end = seek(anchor, end)
+                if end is None:
+                    break
+            else:
+                found[index].append(strip_offsets(content, start, end))
+                resume_at[index] = end
+        
+        return [(start, end, category) for category, matches in zip(self.categories, found)
+                for start, end in matches if start < end]
+
+REGEX_ENGINE = RegexClauseEngine()
+
+# Bump when the Matcher patterns in NLPProcessor._setup_patterns or the extraction logic
+# change, so cached extraction results from older code are not reused
+PATTERN_SET_VERSION = 4
+
+# Key terms that tag whole sentences with a clause category. Terms are matched on whole
+# tokens, so each is also matched in its plural form, see term_forms.
+DEFAULT_KEY_TERMS = {
+    'payment_terms': ['payment', 'freight', 'demurrage', 'despatch', 'commission'],
+    'laytime_clauses': ['laytime', 'loading', 'discharging', 'notice', 'commencement'],
+    'port_clauses': ['port', 'berth', 'anchorage', 'terminal', 'wharf'],
+    'general_terms': ['force majeure', 'arbitration', 'governing law', 'cancellation']
+}
+
+def term_forms(term: str) -> List[str]:
+    """A key term and its regular plural, inflecting the last word: 'notice' -> 'notices'"""
+    if term.endswith(('ss', 'x', 'z', 'ch', 'sh')):
+        return [term, term + 'es']
+    if term.endswith('s'):
+        return [term]  # Most likely already a plural
+    if len(term) > 1 and term[-1] == 'y' and term[-2] not in 'aeiou':
+        return [term, term[:-1] + 'ies']
+    return [term, term + 's']
+
+def load_taxonomy(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Key terms extended with a JSON file of {"category": ["term", ...]}.
+    
+    Terms for existing categories are added to the defaults; unknown categories are
+    added as new clause categories.
+    """
+    key_terms = {category: list(terms) for category, terms in DEFAULT_KEY_TERMS.items()}
+    if path:
+        with open(path, 'r') as f:
+            for category, terms in json.load(f).items():
+                existing = key_terms.setdefault(category, [])
+                existing.extend(term for term in terms if term not in existing)
+    return key_terms
+
+# Documents longer than this many characters are parsed in windows of about this size,
+# which keeps a single Doc (and peak memory) bounded and stays under spaCy's max_length
+DEFAULT_CHUNK_CHARS = 100000
+
+# Chunk edges in order of preference: paragraph break, line break, clause terminator, space
+CHUNK_BOUNDARIES = ('\n\n', '\n', '. ', '; ', ' ')
+
+def iter_text_chunks(content: str, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets splitting ``content`` into chunks of at most ``max_chars``.
+    
+    Each chunk ends just after the last paragraph break within the window, falling back to
+    a line break, a clause terminator, a space and finally a hard cut.
+    """
+    start = 0
+    while len(content) - start > max_chars:
+        limit = start + max_chars
+        for boundary in CHUNK_BOUNDARIES:
+            # Only accept an edge in the second half of the window, so chunks stay large
+            cut = content.rfind(boundary, start + max_chars // 2, limit)
+            if cut != -1:
+                end = cut + len(boundary)
+                break
+        else:
+            end = limit
+        yield start, end
+        start = end
+    if start < len(content):
+        yield start, len(content)
+
+# Per-process NLPProcessor used by pool workers, loaded once by _init_worker
+_worker_processor = None
+
+def _init_worker(profile: str = 'full', key_terms: Optional[Dict[str, List[str]]] = None,
+                 chunk_chars: int = DEFAULT_CHUNK_CHARS):
+    global _worker_processor
+    _worker_processor = NLPProcessor(profile=profile, key_terms=key_terms, chunk_chars=chunk_chars)
+
+def _extract_in_worker(doc_type: str, content: str) -> List[list]:
+    return _worker_processor._extract_document(doc_type, content)
 
 class NLPProcessor:
     """Handles NLP processing for clause extraction and analysis"""
     
-    def __init__(self):
+    EXECUTION_MODES = ('sequential', 'process')
+    
+    def __init__(self, execution_mode: str = 'sequential', max_workers: int = 3, profile: str = 'full',
+                 key_terms: Optional[Dict[str, List[str]]] = None, cache=None,
+                 chunk_chars: int = DEFAULT_CHUNK_CHARS):
         self.logger = logging.getLogger(__name__)
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Unknown NLP execution mode: {execution_mode}")
+        self.execution_mode = execution_mode
+        self.max_workers = max_workers
+        self.profile = profile
+        self.key_terms = key_terms or DEFAULT_KEY_TERMS
+        self.chunk_chars = chunk_chars
+        self._pool = SpawnedPool(max_workers, initializer=_init_worker,
+                                 initargs=(profile, self.key_terms, chunk_chars))
         try:
             # Load English language model
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = load_pipeline("en_core_web_sm", profile)
         except OSError:
             self.logger.warning("spaCy English model not found. Using basic processing.")
             self.nlp = None
         
-        # Initialize matcher for common contract patterns
+        # A chunk plus the sentence carried over from the previous one must fit in max_length
+        if self.nlp and 2 * chunk_chars > self.nlp.max_length:
+            raise ValueError(f"NLP chunk size {chunk_chars} is too large for max_length {self.nlp.max_length}")
+        
+        # Initialize matchers for common contract patterns and key terms
         if self.nlp:
             self.matcher = Matcher(self.nlp.vocab)
             self._setup_patterns()
+            self.term_matcher = PhraseMatcher(self.nlp.vocab, attr='LOWER')
+            for category, terms in self.key_terms.items():
+                forms = [form for term in terms for form in term_forms(term)]
+                self.term_matcher.add(category, list(self.nlp.tokenizer.pipe(forms)))
+        
+        # Optional ExtractionCache; the namespace covers everything besides the text
+        # that a cached result depends on, so changing any of it invalidates old entries
+        self.cache = cache
+        model = f"{self.nlp.meta['name']}-{self.nlp.meta['version']}" if self.nlp else 'regex-only'
+        fingerprint = json.dumps([PATTERN_SET_VERSION, REGEX_CLAUSE_PATTERNS, MAX_CLAUSE_CHARS,
+                                  self.key_terms, self.nlp.pipe_names if self.nlp else None, chunk_chars])
+        self.cache_namespace = f"{spacy.__version__}:{model}:{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()}"
     
     def _setup_patterns(self):
         """Setup common contract clause patterns"""
@@ -45,14 +289,53 @@ class NLPProcessor:
             [{"LIKE_NUM": True}, {"LOWER": {"IN": ["mt", "tons", "tonnes", "metric"]}}]
         ]
         
-        # Add patterns to matcher
-        self.matcher.add("PAYMENT_TERMS", payment_patterns)
-        self.matcher.add("LAYTIME", laytime_patterns)
-        self.matcher.add("CARGO", cargo_patterns)
+        # Add patterns to matcher. The trailing "*" would otherwise return every prefix of
+        # a run of words as its own match; LONGEST keeps one non-overlapping span per run.
+        self.matcher.add("PAYMENT_TERMS", payment_patterns, greedy="LONGEST")
+        self.matcher.add("LAYTIME", laytime_patterns, greedy="LONGEST")
+        self.matcher.add("CARGO", cargo_patterns, greedy="LONGEST")
     
     def extract_clauses(self, document_contents: Dict[str, str]) -> Dict[str, List[str]]:
         """Extract and categorize clauses from document contents"""
+        return resolve_clauses(self.extract_clause_spans(document_contents), document_contents, self._empty_result())
+    
+    def extract_clause_spans(self, document_contents: Dict[str, str]) -> List[ClauseSpan]:
+        """Extract clauses as spans of the documents, in document order"""
         
+        extracted_clauses = []
+        
+        try:
+            documents = [(doc_type, content) for doc_type, content in document_contents.items() if content]
+            
+            # Reuse cached results for documents seen before, e.g. a standard base CP
+            keys = [self._cache_key(content) for _, content in documents]
+            partial_results = [self.cache.get(key) if key else None for key in keys]
+            missing = [i for i, partial in enumerate(partial_results) if partial is None]
+            to_extract = [documents[i] for i in missing]
+            
+            # Process each remaining document, in parallel worker processes when enabled
+            if self.execution_mode == 'process' and self.nlp and len(to_extract) > 1:
+                extracted = self._extract_in_pool(to_extract)
+            else:
+                extracted = [self._extract_document(doc_type, content) for doc_type, content in to_extract]
+            
+            for i, partial in zip(missing, extracted):
+                partial_results[i] = partial
+                if keys[i]:
+                    self.cache.put(keys[i], partial)
+            
+            # Merge in input order so both execution modes produce identical results
+            for (doc_type, _), partial in zip(documents, partial_results):
+                self._merge_into(extracted_clauses, doc_type, partial)
+            
+            extracted_clauses = self._finalize(extracted_clauses)
+            
+        except Exception as e:
+            self.logger.error(f"Error in clause extraction: {str(e)}")
+        
+        return extracted_clauses
+    
+    def _empty_result(self) -> Dict[str, List[str]]:
         extracted_clauses = {
             'payment_terms': [],
             'laytime_clauses': [],
@@ -61,165 +344,217 @@ class NLPProcessor:
             'general_terms': [],
             'key_entities': []
         }
+        for category in self.key_terms:
+            extracted_clauses.setdefault(category, [])
+        return extracted_clauses
+    
+    def extract_clauses_batch(self, document_sets: Iterable, batch_size: int = 32,
+                              n_process: int = 1, as_tuples: bool = False) -> Iterator:
+        """Extract clause spans for many contracts, streaming every document through nlp.pipe.
         
-        try:
-            # Process each document
-            for doc_type, content in document_contents.items():
-                if not content:
-                    continue
-                
-                self.logger.info(f"Processing {doc_type} for clause extraction")
-                
-                # Extract clauses using different methods
-                if self.nlp:
-                    # Use spaCy for advanced processing
-                    doc = self.nlp(content)
-                    
-                    # Extract named entities
-                    entities = self._extract_entities(doc)
-                    extracted_clauses['key_entities'].extend(entities)
-                    
-                    # Use pattern matching
-                    pattern_matches = self._extract_pattern_matches(doc)
-                    for category, matches in pattern_matches.items():
-                        extracted_clauses[category].extend(matches)
-                    
-                    # Extract sentences containing key terms
-                    key_sentences = self._extract_key_sentences(doc)
-                    for category, sentences in key_sentences.items():
-                        extracted_clauses[category].extend(sentences)
-                
-                # Fallback to regex-based extraction
-                regex_clauses = self._extract_with_regex(content)
-                for category, clauses in regex_clauses.items():
-                    extracted_clauses[category].extend(clauses)
-            
-            # Remove duplicates and clean up
-            for category in extracted_clauses:
-                extracted_clauses[category] = list(set(extracted_clauses[category]))
-                extracted_clauses[category] = [clause.strip() for clause in extracted_clauses[category] if clause.strip()]
-            
-            self.logger.info(f"Extracted clauses: {sum(len(clauses) for clauses in extracted_clauses.values())} total")
-            
-        except Exception as e:
-            self.logger.error(f"Error in clause extraction: {str(e)}")
+        Each item of ``document_sets`` is a ``document_contents`` dict as accepted by
+        ``extract_clause_spans``, or a ``(document_contents, context)`` pair when ``as_tuples``
+        is set. Results are yielded in input order as soon as each contract's documents
+        have been parsed, paired with their context when ``as_tuples`` is set.
+        """
+        if not as_tuples:
+            document_sets = ((document_contents, None) for document_contents in document_sets)
+        
+        if not self.nlp:
+            for document_contents, context in document_sets:
+                result = self.extract_clause_spans(document_contents)
+                yield (result, context) if as_tuples else result
+            return
+        
+        # Per-document results of each contract, filled from the cache or from nlp.pipe.
+        # Contracts needing no parsing never reach nlp.pipe, so they wait in `ready`
+        # until the output catches up with them, which keeps results in input order.
+        contexts = {}
+        sources = {}
+        slots = {}
+        ready = deque()
+        
+        def flatten():
+            for index, (document_contents, context) in enumerate(document_sets):
+                contexts[index] = context
+                documents = [(doc_type, content) for doc_type, content in document_contents.items() if content]
+                sources[index] = [doc_type for doc_type, _ in documents]
+                keys = [self._cache_key(content) for _, content in documents]
+                slots[index] = [self.cache.get(key) if key else None for key in keys]
+                # Long documents are parsed in windows right here rather than whole by nlp.pipe
+                for position, (doc_type, content) in enumerate(documents):
+                    if slots[index][position] is None and len(content) > self.chunk_chars:
+                        slots[index][position] = self._extract_document(doc_type, content)
+                        if keys[position]:
+                            self.cache.put(keys[position], slots[index][position])
+                pending = [position for position, partial in enumerate(slots[index]) if partial is None]
+                if not pending:
+                    ready.append(index)
+                for position in pending:
+                    doc_type, content = documents[position]
+                    yield content, (index, position, doc_type, keys[position], position == pending[-1])
+        
+        def emit(index):
+            extracted_clauses = []
+            for doc_type, partial in zip(sources.pop(index), slots.pop(index)):
+                self._merge_into(extracted_clauses, doc_type, partial)
+            result = self._finalize(extracted_clauses)
+            context = contexts.pop(index)
+            return (result, context) if as_tuples else result
+        
+        for doc, (index, position, doc_type, key, is_last) in self.nlp.pipe(
+                flatten(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+            while ready and ready[0] < index:
+                yield emit(ready.popleft())
+            partial = self._extract_document(doc_type, doc.text, doc=doc)
+            slots[index][position] = partial
+            if key:
+                self.cache.put(key, partial)
+            if is_last:
+                yield emit(index)
+        while ready:
+            yield emit(ready.popleft())
+    
+    def _cache_key(self, content: str) -> Optional[str]:
+        return self.cache.make_key(self.cache_namespace, content) if self.cache else None
+    
+    @staticmethod
+    def _merge_into(extracted_clauses: List[ClauseSpan], doc_type: str, partial: List[list]):
+        extracted_clauses.extend(ClauseSpan(doc_type, *record) for record in partial)
+    
+    def _finalize(self, extracted_clauses: List[ClauseSpan]) -> List[ClauseSpan]:
+        """Remove duplicates and empty spans; texts repeated at other offsets are deduplicated on resolution"""
+        extracted_clauses = [span for span in dict.fromkeys(extracted_clauses) if span.start < span.end]
+        
+        self.logger.info(f"Extracted clauses: {len(extracted_clauses)} spans total")
+        return extracted_clauses
+    
+    def _extract_document(self, doc_type: str, content: str, doc=None) -> List[list]:
+        """Extract clauses from a single document as [start, end, category, label] records,
+        reusing ``doc`` if already parsed"""
+        extracted_clauses = []
+        
+        self.logger.info(f"Processing {doc_type} for clause extraction")
+        
+        # Extract clauses using different methods
+        if self.nlp:
+            # Use spaCy for advanced processing, in windows for long documents
+            if doc is not None:
+                extracted_clauses.extend(self._extract_from_doc(doc))
+            elif len(content) <= self.chunk_chars:
+                extracted_clauses.extend(self._extract_from_doc(self.nlp(content)))
+            else:
+                for offset, records in self._iter_chunk_results(content):
+                    extracted_clauses.extend([start + offset, end + offset, category, label]
+                                             for start, end, category, label in records)
+        
+        # Fallback to regex-based extraction
+        extracted_clauses.extend([start, end, category, None] for start, end, category in self._extract_with_regex(content))
         
         return extracted_clauses
     
-    def _extract_entities(self, doc) -> List[str]:
+    def _extract_from_doc(self, doc) -> List[list]:
+        """Run the spaCy-based extractors over a parsed Doc (or a sentence-aligned Span of one)"""
+        # Extract named entities
+        extracted = self._extract_entities(doc)
+        
+        # Use pattern matching
+        extracted.extend(self._extract_pattern_matches(doc))
+        
+        # Extract sentences containing key terms
+        extracted.extend(self._extract_key_sentences(doc))
+        return extracted
+    
+    def _iter_chunk_results(self, content: str) -> Iterator[Tuple[int, List[list]]]:
+        """Parse a long document one chunk at a time, yielding each chunk's offset and clauses.
+        
+        The last sentence of a chunk may continue in the next one, so it is left out of
+        that chunk's results and its text is parsed again at the start of the next chunk.
+        Only one chunk's Doc is alive at a time.
+        """
+        carry = 0  # Start of the carried-over sentence
+        chunks = list(iter_text_chunks(content, self.chunk_chars))
+        for number, (start, end) in enumerate(chunks, 1):
+            doc = self.nlp(content[carry:end])
+            sents = list(doc.sents) if number < len(chunks) else []
+            if len(sents) > 1 and len(sents[-1].text) < self.chunk_chars:
+                yield carry, self._extract_from_doc(doc[:sents[-1].start])
+                carry += sents[-1].start_char
+            else:
+                yield carry, self._extract_from_doc(doc)
+                carry = end
+    
+    def _extract_in_pool(self, documents) -> List[List[list]]:
+        """Parse documents concurrently, one spaCy model per worker process"""
+        try:
+            futures = [self._pool.submit(_extract_in_worker, doc_type, content) for doc_type, content in documents]
+            return [future.result() for future in futures]
+        except Exception as e:
+            self.logger.warning(f"Parallel clause extraction failed, falling back to sequential: {str(e)}")
+            self.shutdown()
+            return [self._extract_document(doc_type, content) for doc_type, content in documents]
+    
+    def shutdown(self):
+        """Stop the worker pool, if one was started"""
+        self._pool.shutdown()
+    
+    def _extract_entities(self, doc) -> List[list]:
         """Extract named entities from document"""
         entities = []
         for ent in doc.ents:
             if ent.label_ in ['ORG', 'GPE', 'MONEY', 'DATE', 'QUANTITY']:
-                entities.append(f"{ent.text} ({ent.label_})")
+                entities.append([ent.start_char, ent.end_char, 'key_entities', ent.label_])
         return entities
     
-    def _extract_pattern_matches(self, doc) -> Dict[str, List[str]]:
+    def _extract_pattern_matches(self, doc) -> List[list]:
         """Extract clauses using pattern matching"""
-        matches = {
-            'payment_terms': [],
-            'laytime_clauses': [],
-            'cargo_specifications': []
+        categories = {
+            'PAYMENT_TERMS': 'payment_terms',
+            'LAYTIME': 'laytime_clauses',
+            'CARGO': 'cargo_specifications'
         }
         
-        # Get pattern matches
-        pattern_matches = self.matcher(doc)
+        # Get pattern matches, deduplicated on token offsets
+        spans = {}
+        for match_id, start, end in self.matcher(doc):
+            spans.setdefault(match_id, set()).add((start, end))
         
-        for match_id, start, end in pattern_matches:
-            label = self.nlp.vocab.strings[match_id]
-            matched_text = doc[start:end].text
-            
-            if label == "PAYMENT_TERMS":
-                matches['payment_terms'].append(matched_text)
-            elif label == "LAYTIME":
-                matches['laytime_clauses'].append(matched_text)
-            elif label == "CARGO":
-                matches['cargo_specifications'].append(matched_text)
+        matches = []
+        for match_id, offsets in spans.items():
+            category = categories.get(self.nlp.vocab.strings[match_id])
+            if category is None:
+                continue
+            # Greedy matching already leaves one non-overlapping span per run of words
+            for start, end in sorted(offsets):
+                span = doc[start:end]
+                matches.append([span.start_char, span.end_char, category, None])
         
         return matches
     
-    def _extract_key_sentences(self, doc) -> Dict[str, List[str]]:
+    def _extract_key_sentences(self, doc) -> List[list]:
         """Extract sentences containing key contract terms"""
-        key_terms = {
-            'payment_terms': ['payment', 'freight', 'demurrage', 'despatch', 'commission'],
-            'laytime_clauses': ['laytime', 'loading', 'discharging', 'notice', 'commencement'],
-            'port_clauses': ['port', 'berth', 'anchorage', 'terminal', 'wharf'],
-            'general_terms': ['force majeure', 'arbitration', 'governing law', 'cancellation']
-        }
+        extracted = []
         
-        extracted = {category: [] for category in key_terms}
+        # One PhraseMatcher pass over the doc tags each sentence with its categories
+        sentence_categories = {}
+        for match_id, start, end in self.term_matcher(doc):
+            sent = doc[start].sent
+            sentence_categories.setdefault(sent.start, (sent, set()))[1].add(self.nlp.vocab.strings[match_id])
         
-        for sent in doc.sents:
-            sent_text = sent.text.strip()
-            sent_lower = sent_text.lower()
-            
-            for category, terms in key_terms.items():
-                if any(term in sent_lower for term in terms):
-                    if len(sent_text) > 20:  # Filter out very short sentences
-                        extracted[category].append(sent_text)
+        for sent_start in sorted(sentence_categories):
+            sent, categories = sentence_categories[sent_start]
+            start, end = strip_offsets(sent.text, 0, len(sent.text))
+            if end - start <= 20:  # Filter out very short sentences
+                continue
+            for category in self.key_terms:
+                if category in categories:
+                    extracted.append([sent.start_char + start, sent.start_char + end, category, None])
         
         return extracted
     
-    def _extract_with_regex(self, content: str) -> Dict[str, List[str]]:
+    def _extract_with_regex(self, content: str) -> List[Tuple[int, int, str]]:
         """Extract clauses using regex patterns as fallback"""
-        extracted = {
-            'payment_terms': [],
-            'laytime_clauses': [],
-            'cargo_specifications': [],
-            'port_clauses': [],
-            'general_terms': []
-        }
-        
-        # Payment terms patterns
-        payment_patterns = [
-            r'freight\s+.*?payable.*?[.;]',
-            r'demurrage\s+.*?[.;]',
-            r'payment\s+.*?[.;]'
-        ]
-        
-        # Laytime patterns
-        laytime_patterns = [
-            r'laytime\s+.*?[.;]',
-            r'loading\s+time\s+.*?[.;]',
-            r'discharging\s+time\s+.*?[.;]'
-        ]
-        
-        # Cargo patterns
-        cargo_patterns = [
-            r'\d+\s*(?:mt|tons?|tonnes?)\s+.*?[.;]',
-            r'cargo\s+.*?[.;]',
-            r'quantity\s+.*?[.;]'
-        ]
-        
-        # Port patterns
-        port_patterns = [
-            r'port\s+of\s+.*?[.;]',
-            r'berth\s+.*?[.;]',
-            r'terminal\s+.*?[.;]'
-        ]
-        
-        # General terms patterns
-        general_patterns = [
-            r'force\s+majeure\s+.*?[.;]',
-            r'arbitration\s+.*?[.;]',
-            r'governing\s+law\s+.*?[.;]'
-        ]
-        
-        # Apply patterns
-        pattern_groups = [
-            (payment_patterns, 'payment_terms'),
-            (laytime_patterns, 'laytime_clauses'),
-            (cargo_patterns, 'cargo_specifications'),
-            (port_patterns, 'port_clauses'),
-            (general_patterns, 'general_terms')
-        ]
-        
-        for patterns, category in pattern_groups:
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.DOTALL)
-                extracted[category].extend([match.strip() for match in matches])
-        
-        return extracted
+        return REGEX_ENGINE.extract_spans(content)
     
     def analyze_contract_completeness(self, extracted_clauses: Dict[str, List[str]]) -> Dict[str, str]:
         """Analyze completeness of contract based on extracted clauses"""
@@ -0,0 +1,146 @@
+import io
+import math
+import time
+import signal
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import BrokenExecutor, TimeoutError as FutureTimeout
+from typing import Iterator, List, Tuple
+import PyPDF2
+from worker_pool import SpawnedPool
+
+# Kept free of app imports so spawned workers only load PyPDF2
+
+@dataclass
+class PageText:
+    """Text of one PDF page and how long it took to extract"""
+    number: int
+    text: str
+    seconds: float
+    timed_out: bool = False
+
+class PageTimeout(Exception):
+    pass
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+def _can_time_limit() -> bool:
+    """Whether _time_limit can interrupt code here: SIGALRM only reaches the main thread of a POSIX process"""
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+@contextmanager
+def _time_limit(seconds: float):
+    """Interrupt the block after ``seconds``, where _can_time_limit() allows it"""
+    if not seconds or not _can_time_limit():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def extract_page_range(data: bytes, start: int, end: int, page_timeout: float) -> List[Tuple[str, float, bool]]:
+    """Extract pages [start, end) of a PDF, giving up on any page that exceeds page_timeout"""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    results = []
+    for number in range(start, end):
+        started = time.perf_counter()
+        try:
+            with _time_limit(page_timeout):
+                text = reader.pages[number].extract_text() or ''
+            timed_out = False
+        except PageTimeout:
+            text, timed_out = '', True
+        results.append((text, time.perf_counter() - started, timed_out))
+    return results
+
+class PdfPageExtractor:
+    """Extracts PDF text page by page, spreading page ranges of large files over a process pool.
+    
+    Every page gets a time budget so one pathological page cannot stall an upload,
+    and per-page timings are logged to help diagnose slow documents. Files with fewer
+    than ``parallel_min_pages`` pages are read in-process where the budget can be
+    enforced, i.e. on the main thread; from a job thread they go to one pool worker.
+    With ``max_workers=0`` everything is read in-process.
+    """
+    
+    def __init__(self, max_workers: int = 2, page_timeout: float = 30, max_pages: int = 500,
+                 parallel_min_pages: int = 16):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self.page_timeout = page_timeout
+        self.max_pages = max_pages
+        self.parallel_min_pages = parallel_min_pages
+        self._pool = SpawnedPool(max_workers)
+    
+    def iter_pages(self, data: bytes) -> Iterator[PageText]:
+        """Yield the pages of a PDF in order"""
+        page_count = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+        if self.max_pages and page_count > self.max_pages:
+            raise ValueError(f"PDF has {page_count} pages, the limit is {self.max_pages}")
+        
+        started = time.perf_counter()
+        pages = []
+        if self.max_workers > 0 and page_count >= self.parallel_min_pages:
+            page_iter = self._extract_in_pool(data, self._page_ranges(page_count))
+        elif self.max_workers > 0 and self.page_timeout and not _can_time_limit():
+            # The page budget can't interrupt this thread, but it can a worker's main thread
+            page_iter = self._extract_in_pool(data, [(0, page_count)])
+        else:
+            page_iter = self._extract_range(data, 0, page_count)
+        for page in page_iter:
+            pages.append(page)
+            yield page
+        self._log_timings(pages, time.perf_counter() - started)
+    
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        # Twice as many ranges as workers, so one slow range doesn't leave the others idle
+        size = max(1, math.ceil(page_count / (self.max_workers * 2)))
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+    
+    def _extract_range(self, data: bytes, start: int, end: int) -> Iterator[PageText]:
+        results = extract_page_range(data, start, end, self.page_timeout)
+        for number, (text, seconds, timed_out) in enumerate(results, start + 1):
+            yield PageText(number, text, seconds, timed_out)
+    
+    def _extract_in_pool(self, data: bytes, ranges: List[Tuple[int, int]]) -> Iterator[PageText]:
+        """Extract page ranges concurrently and reassemble them in page order"""
+        futures = [self._pool.submit(extract_page_range, data, start, end, self.page_timeout)
+                   for start, end in ranges]
+        for (start, end), future in zip(ranges, futures):
+            try:
+                # The signal based page budget does the real work; this only guards against a lost worker
+                results = future.result(timeout=self.page_timeout * (end - start) + 60 if self.page_timeout else None)
+            except FutureTimeout:
+                # A worker stuck past its page budget would hold its slot for good, so start afresh
+                self.logger.error(f"PDF pages {start + 1}-{end} did not finish, skipping them")
+                self._pool.terminate()
+                results = [('', 0.0, True)] * (end - start)
+            except BrokenExecutor:
+                self.logger.error(f"PDF pages {start + 1}-{end} were lost with their worker, skipping them")
+                self._pool.terminate()
+                results = [('', 0.0, True)] * (end - start)
+            for number, (text, seconds, timed_out) in enumerate(results, start + 1):
+                yield PageText(number, text, seconds, timed_out)
+    
+    def _log_timings(self, pages: List[PageText], elapsed: float):
+        if not pages:
+            return
+        slowest = max(pages, key=lambda page: page.seconds)
+        self.logger.info(f"Extracted {len(pages)} PDF pages in {elapsed:.2f}s "
+                         f"(slowest: page {slowest.number}, {slowest.seconds:.2f}s)")
+        self.logger.debug('PDF page timings: ' + ', '.join(f"{page.number}={page.seconds:.3f}s" for page in pages))
+        timed_out = [str(page.number) for page in pages if page.timed_out]
+        if timed_out:
+            self.logger.warning(f"PDF pages exceeded the {self.page_timeout}s budget and were skipped: "
+                                f"{', '.join(timed_out)}")
+    
+    def shutdown(self):
+        """Stop the worker pool, if one was started"""
+        self._pool.shutdown()
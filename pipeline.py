@@ -0,0 +1,176 @@
+import io
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+from werkzeug.datastructures import FileStorage
+from models import Contract
+from contract_store import dump_json, load_json
+from contract_blocks import dump_blocks, parse_contract_blocks
+from contract_clauses import ClauseSet, ClauseSpan, resolve_clauses
+
+DOCUMENT_TYPES = ('fixture_recap', 'base_cp', 'negotiated_clauses')
+
+def stage_key(*parts: Union[str, bytes]) -> str:
+    """Content hash of a stage's inputs"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+@dataclass
+class DocumentSource:
+    """One pipeline input: either pasted text or the raw bytes of an uploaded file"""
+    text: Optional[str] = None
+    filename: Optional[str] = None
+    data: Optional[bytes] = None
+    
+    def key(self) -> str:
+        """Key of the extract stage: the file type and bytes, or the text itself"""
+        if self.data is not None:
+            return stage_key('file', self.filename.rsplit('.', 1)[-1].lower(), self.data)
+        return stage_key('text', self.text or '')
+
+@dataclass
+class StageKeys:
+    """Keys of the stage inputs a contract's stored outputs were built from; serializes as JSON"""
+    extract: Dict[str, str] = field(default_factory=dict)  # Document type -> DocumentSource.key()
+    merge: Optional[str] = None  # Key of the document texts and extraction settings
+    
+    def dump(self) -> str:
+        return dump_json({'extract': self.extract, 'merge': self.merge})
+    
+    @classmethod
+    def load(cls, data: Optional[str]) -> 'StageKeys':
+        """Parse stored keys; contracts built before stages were keyed have none"""
+        value = load_json(data) if data else {}
+        return cls(extract=value.get('extract', {}), merge=value.get('merge'))
+
+class ContractPipeline:
+    """Runs the contract generation stages: extract -> NLP per document -> merge -> render.
+    
+    Each stage is keyed by a content hash of its inputs, so only the stages whose inputs
+    changed run again. Extraction is skipped for a source identical to the one stored,
+    NLP results per document come from the extraction cache, merging is skipped when no
+    document text changed, and DOCX/PDF files are rendered on download and cached by the
+    version of the merged contract.
+    """
+    
+    def __init__(self, doc_processor, nlp_processor):
+        self.logger = logging.getLogger(__name__)
+        self.doc_processor = doc_processor
+        self.nlp_processor = nlp_processor
+    
+    def run(self, contract_id: str, sources: Dict[str, DocumentSource],
+            report: Callable[[str, int, str], None] = lambda stage, progress, message: None):
+        """Process the given sources into a completed contract, reporting stage progress"""
+        contract = Contract.load(contract_id)
+        if contract is None:
+            raise ValueError(f"Contract {contract_id} no longer exists")
+        
+        # Text extraction
+        report('extract', 5, 'Extracting text from documents')
+        document_contents = self.extract_texts(sources)
+        keys = StageKeys(extract={doc_type: source.key() for doc_type, source in sources.items()})
+        
+        return self._build(contract, document_contents, keys, None, report)
+    
+    def replace_document(self, contract_id: str, doc_type: str, source: DocumentSource,
+                         report: Callable[[str, int, str], None] = lambda stage, progress, message: None):
+        """Swap one input document of an existing contract, re-running only the stages it affects"""
+        if doc_type not in DOCUMENT_TYPES:
+            raise ValueError(f"Unknown document type: {doc_type}")
+        contract = Contract.load(contract_id)
+        if contract is None:
+            raise ValueError(f"Contract {contract_id} no longer exists")
+        previous = StageKeys.load(contract.stage_keys)
+        
+        # The other documents are taken from the contract as they were extracted
+        document_contents = {}
+        for other_type in DOCUMENT_TYPES:
+            content = getattr(contract, f'{other_type}_content')
+            if other_type != doc_type and content:
+                document_contents[other_type] = content
+        
+        key = source.key()
+        if previous.extract.get(doc_type) == key and getattr(contract, f'{doc_type}_content') is not None:
+            report('extract', 5, 'Document unchanged, reusing its extracted text')
+            document_contents[doc_type] = getattr(contract, f'{doc_type}_content')
+        else:
+            report('extract', 5, 'Extracting text from the new document')
+            document_contents[doc_type] = self.extract_texts({doc_type: source})[doc_type]
+        keys = StageKeys(extract={other_type: other_key for other_type, other_key in previous.extract.items()
+                                  if other_type in document_contents})
+        keys.extract[doc_type] = key
+        
+        return self._build(contract, document_contents, keys, previous.merge, report)
+    
+    def _build(self, contract: Contract, document_contents: Dict[str, str], keys: StageKeys,
+               previous_merge: Optional[str], report: Callable[[str, int, str], None]) -> Contract:
+        # Validate that we have at least one document
+        if not any(document_contents.values()):
+            raise ValueError("At least one document must be provided")
+        
+        if previous_merge is not None and previous_merge == self.merge_key(document_contents):
+            # Same texts and settings as the stored outputs, which stay as they are
+            report('merge', 60, 'Documents unchanged, keeping the merged contract')
+            keys.merge = previous_merge
+            contract.stage_keys = keys.dump()
+            contract.status = 'completed'
+            contract.save()
+            return contract
+        
+        # Process with NLP; documents seen before are served by the extraction cache
+        report('nlp', 25, 'Analyzing documents and extracting clauses')
+        clause_spans = self.nlp_processor.extract_clause_spans(document_contents)
+        
+        return self.complete(contract, document_contents, clause_spans, report, keys)
+    
+    def extract_texts(self, sources: Dict[str, DocumentSource]) -> Dict[str, str]:
+        """Turn pipeline inputs into plain text keyed by document type"""
+        document_contents = {}
+        for doc_type in DOCUMENT_TYPES:
+            source = sources.get(doc_type)
+            if source is None:
+                continue
+            if source.data is not None:
+                document_contents[doc_type] = self.doc_processor.extract_text_from_file(
+                    FileStorage(stream=io.BytesIO(source.data), filename=source.filename)
+                )
+            else:
+                document_contents[doc_type] = source.text
+        return document_contents
+    
+    def merge_key(self, document_contents: Dict[str, str]) -> str:
+        """Key of the merge stage: every document text plus the settings its clauses were extracted with"""
+        parts = [self.nlp_processor.cache_namespace]
+        for doc_type in DOCUMENT_TYPES:
+            if document_contents.get(doc_type):
+                parts += [doc_type, document_contents[doc_type]]
+        return stage_key('merge', *parts)
+    
+    def complete(self, contract: Contract, document_contents: Dict[str, str], clause_spans: List[ClauseSpan],
+                 report: Callable[[str, int, str], None] = lambda stage, progress, message: None,
+                 keys: Optional[StageKeys] = None) -> Contract:
+        """Merge a contract whose clauses have already been extracted"""
+        for doc_type, content in document_contents.items():
+            setattr(contract, f'{doc_type}_content', content)
+        
+        # Generate final contract
+        report('merge', 60, 'Merging documents into the final contract')
+        extracted_clauses = resolve_clauses(clause_spans, document_contents)
+        final_contract, offsets = self.doc_processor.merge_documents_with_offsets(document_contents, extracted_clauses)
+        contract.final_contract_content = final_contract
+        # Clauses are stored as spans of the documents; the offsets place them in the final contract
+        contract.extracted_clauses = ClauseSet(clause_spans, offsets).dump()
+        # Parsed once here; the preview and both renderers work from these blocks
+        contract.document_blocks = dump_blocks(parse_contract_blocks(final_contract))
+        keys = keys or StageKeys()
+        keys.merge = self.merge_key(document_contents)
+        contract.stage_keys = keys.dump()
+        contract.status = 'completed'
+        
+        # Save contract
+        contract.save()
+        return contract
@@ -0,0 +1,128 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+RENDER_FORMATS = ('docx', 'pdf')
+
+# Names of the files the cache owns: the hex key from make_key plus the format.
+# Outputs of older versions (<name>_<timestamp>.docx) share the directory and are left alone.
+CACHED_FILE = re.compile(r'[0-9a-f]{64}\.(?:' + '|'.join(RENDER_FORMATS) + ')')
+
+class RenderCache:
+    """On-demand DOCX/PDF rendering with the results cached on disk.
+    
+    Files are named after a hash of the contract version (the content hash of its
+    parsed blocks), title and format, so any edit to a contract produces a new file
+    and a cache hit never has to read the contract body.
+    A file's mtime is its render time and its atime the last time it was served.
+    Renders are serialised per file with a thread lock plus an flock on a lock file,
+    so concurrent first downloads, even from different gunicorn workers, render once.
+    Once its files grow past ``max_bytes`` the least recently served ones are removed.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int, render: Callable[[Any, str, str, str], None]):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.render = render
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def make_key(version: str, file_type: str, title: str) -> str:
+        return hashlib.sha256(f'{file_type}\0{title}\0{version}'.encode('utf-8')).hexdigest()
+    
+    def get_or_render(self, version: str, file_type: str, title: str, load_document: Callable[[], Any]) -> str:
+        """Return the path of the rendered file, loading and rendering the document only if it is not cached"""
+        if file_type not in RENDER_FORMATS:
+            raise ValueError(f"Unsupported output format: {file_type}")
+        key = self.make_key(version, file_type, title)
+        path = os.path.join(self.directory, f'{key}.{file_type}')
+        if self._touch(path):
+            return path
+        
+        with self._render_lock(key):
+            # Another request may have rendered it while we waited for the lock
+            if self._touch(path):
+                return path
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                self.render(load_document(), file_type, temp_path, title)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            self.logger.info(f"Rendered {file_type} for '{title}' into the render cache")
+        
+        self.evict(keep=path)
+        return path
+    
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Mark a cached file as recently used; False if it isn't cached"""
+        try:
+            # Only the access time moves, so the mtime keeps serving as Last-Modified
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    @contextmanager
+    def _render_lock(self, key: str):
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            lock_path = os.path.join(self.directory, f'.{key}.lock')
+            while True:
+                lock_file = open(lock_path, 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # The previous holder may have removed the lock file while we waited for it
+                try:
+                    if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                lock_file.close()
+            try:
+                yield
+            finally:
+                # Holding the lock on the file at lock_path, so nobody else can be using it
+                os.remove(lock_path)
+                lock_file.close()
+        with self._locks_guard:
+            if self._locks.get(key) is lock and not lock.locked():
+                del self._locks[key]
+    
+    def evict(self, keep: str = None):
+        """Remove least recently used cached files until they fit in max_bytes"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and CACHED_FILE.fullmatch(entry.name):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,15 +1,37 @@
 import os
-import json
-from flask import render_template, request, redirect, url_for, flash, send_file, jsonify
-from werkzeug.utils import secure_filename
+from flask import render_template, request, redirect, url_for, flash, jsonify
+from werkzeug.utils import secure_filename, send_file as werkzeug_send_file
 from app import app
 from models import Contract
+from contract_store import get_store
 from document_processor import DocumentProcessor
-from nlp_processor import NLPProcessor
+from pdf_extraction import PdfPageExtractor
+from nlp_processor import NLPProcessor, load_taxonomy
+from extraction_cache import ExtractionCache
+from render_cache import RenderCache
+from contract_blocks import SECTION
+from pipeline import ContractPipeline, DocumentSource, DOCUMENT_TYPES
+from job_queue import JobQueue
 
 # Initialize processors
-doc_processor = DocumentProcessor()
-nlp_processor = NLPProcessor()
+doc_processor = DocumentProcessor(PdfPageExtractor(max_workers=app.config['PDF_EXTRACTION_WORKERS'],
+                                                   page_timeout=app.config['PDF_PAGE_TIMEOUT'],
+                                                   max_pages=app.config['PDF_MAX_PAGES'],
+                                                   parallel_min_pages=app.config['PDF_PARALLEL_MIN_PAGES']),
+                                  pdf_layout=app.config['PDF_LAYOUT'],
+                                  fast_layout_min_chars=app.config['PDF_FAST_LAYOUT_MIN_CHARS'])
+extraction_cache = (ExtractionCache(app.config['EXTRACTION_CACHE_PATH'], app.config['EXTRACTION_CACHE_MAX_BYTES'])
+                    if app.config['EXTRACTION_CACHE_PATH'] else None)
+nlp_processor = NLPProcessor(execution_mode=app.config['NLP_EXECUTION_MODE'],
+                             max_workers=app.config['NLP_WORKERS'],
+                             profile=app.config['NLP_PIPELINE_PROFILE'],
+                             chunk_chars=app.config['NLP_CHUNK_CHARS'],
+                             key_terms=load_taxonomy(app.config['CLAUSE_TAXONOMY_PATH']),
+                             cache=extraction_cache)
+pipeline = ContractPipeline(doc_processor, nlp_processor)
+render_cache = RenderCache(app.config['GENERATED_FOLDER'], app.config['RENDER_CACHE_MAX_BYTES'],
+                           doc_processor.render_file)
+job_queue = JobQueue(max_workers=app.config['JOB_WORKERS'])
 
 ALLOWED_EXTENSIONS = {'txt', 'doc', 'docx', 'pdf'}
 
@@ -19,10 +41,12 @@ def allowed_file(filename):
 @app.route('/')
 def index():
     """Main dashboard showing recent contracts and system overview"""
-    all_contracts = Contract.get_all()
-    recent_contracts = all_contracts[:5]  # Get first 5 (already sorted by date)
-    total_contracts = len(all_contracts)
-    completed_contracts = Contract.count_by_status('completed')
+    # Both reads are independent of the number of contracts: the top of the
+    # (updated_at, id) index and the trigger-maintained status counters
+    recent_contracts = Contract.get_all(limit=5)
+    status_counts = Contract.status_counts()
+    total_contracts = sum(status_counts.values())
+    completed_contracts = status_counts.get('completed', 0)
     
     stats = {
         'total': total_contracts,
@@ -34,90 +58,106 @@ def index():
 
 @app.route('/upload', methods=['GET', 'POST'])
 def upload_documents():
-    """Handle document upload and processing"""
+    """Handle document upload and queue processing"""
     if request.method == 'POST':
         contract_name = request.form.get('contract_name', '').strip()
         if not contract_name:
             flash('Contract name is required', 'error')
             return redirect(request.url)
         
-        # Create new contract record
+        # Collect each document type from either an uploaded file or pasted text
+        sources = {}
+        for doc_type in DOCUMENT_TYPES:
+            file = request.files.get(f'{doc_type}_file')
+            if file and file.filename:
+                if allowed_file(file.filename):
+                    sources[doc_type] = DocumentSource(filename=file.filename, data=file.read())
+            elif request.form.get(f'{doc_type}_text', '').strip():
+                sources[doc_type] = DocumentSource(text=request.form.get(f'{doc_type}_text').strip())
+        
+        # Validate that we have at least one document
+        if not sources:
+            flash('Error processing contract: At least one document must be provided', 'error')
+            return redirect(request.url)
+        
+        # Create new contract record and hand the heavy lifting to a background job
         contract = Contract(contract_name=contract_name, status='processing')
         contract.save()
+        job_id = job_queue.submit(contract.id, pipeline.run, sources)
         
-        try:
-            # Process each document type
-            document_contents = {}
-            
-            # Handle fixture recap
-            if 'fixture_recap_file' in request.files and request.files['fixture_recap_file'].filename:
-                file = request.files['fixture_recap_file']
-                if allowed_file(file.filename):
-                    content = doc_processor.extract_text_from_file(file)
-                    document_contents['fixture_recap'] = content
-                    contract.fixture_recap_content = content
-            elif request.form.get('fixture_recap_text'):
-                content = request.form.get('fixture_recap_text').strip()
-                document_contents['fixture_recap'] = content
-                contract.fixture_recap_content = content
-            
-            # Handle base CP
-            if 'base_cp_file' in request.files and request.files['base_cp_file'].filename:
-                file = request.files['base_cp_file']
-                if allowed_file(file.filename):
-                    content = doc_processor.extract_text_from_file(file)
-                    document_contents['base_cp'] = content
-                    contract.base_cp_content = content
-            elif request.form.get('base_cp_text'):
-                content = request.form.get('base_cp_text').strip()
-                document_contents['base_cp'] = content
-                contract.base_cp_content = content
-            
-            # Handle negotiated clauses
-            if 'negotiated_clauses_file' in request.files and request.files['negotiated_clauses_file'].filename:
-                file = request.files['negotiated_clauses_file']
-                if allowed_file(file.filename):
-                    content = doc_processor.extract_text_from_file(file)
-                    document_contents['negotiated_clauses'] = content
-                    contract.negotiated_clauses_content = content
-            elif request.form.get('negotiated_clauses_text'):
-                content = request.form.get('negotiated_clauses_text').strip()
-                document_contents['negotiated_clauses'] = content
-                contract.negotiated_clauses_content = content
-            
-            # Validate that we have at least one document
-            if not any(document_contents.values()):
-                raise ValueError("At least one document must be provided")
-            
-            # Process with NLP
-            extracted_clauses = nlp_processor.extract_clauses(document_contents)
-            contract.extracted_clauses = json.dumps(extracted_clauses)
-            
-            # Generate final contract
-            final_contract = doc_processor.merge_documents(document_contents, extracted_clauses)
-            contract.final_contract_content = final_contract
-            
-            # Generate output files
-            docx_path, pdf_path = doc_processor.generate_output_files(
-                final_contract, contract.id, contract_name
-            )
-            contract.docx_path = docx_path
-            contract.pdf_path = pdf_path
-            contract.status = 'completed'
-            
-            # Save contract
-            contract.save()
-            flash('Contract processed successfully!', 'success')
-            return redirect(url_for('preview_contract', contract_id=contract.id))
-            
-        except Exception as e:
-            contract.status = 'error'
-            contract.save()
-            flash(f'Error processing contract: {str(e)}', 'error')
-            app.logger.error(f'Contract processing error: {str(e)}')
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({
+                'contract_id': contract.id,
+                'job_id': job_id,
+                'status_url': url_for('contract_status', contract_id=contract.id),
+                'preview_url': url_for('preview_contract', contract_id=contract.id)
+            }), 202
+        flash('Contract submitted for processing', 'info')
+        return redirect(url_for('preview_contract', contract_id=contract.id))
     
     return render_template('upload.html')
 
+@app.route('/replace/<contract_id>', methods=['POST'])
+def replace_document(contract_id):
+    """Replace one input document of a contract and queue re-processing of the stages it affects"""
+    contract = Contract.load(contract_id)
+    if not contract:
+        flash('Contract not found', 'error')
+        return redirect(url_for('index'))
+    
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    doc_type = request.form.get('doc_type', '')
+    file = request.files.get('file')
+    if file and file.filename:
+        source = DocumentSource(filename=file.filename, data=file.read()) if allowed_file(file.filename) else None
+    elif request.form.get('text', '').strip():
+        source = DocumentSource(text=request.form.get('text').strip())
+    else:
+        source = None
+    
+    error = None
+    if contract.status == 'processing':
+        error = 'Contract is still being processed'
+    elif doc_type not in DOCUMENT_TYPES:
+        error = 'Unknown document type'
+    elif source is None:
+        error = 'A supported file or text is required'
+    if error:
+        if wants_json:
+            return jsonify({'error': error}), 409 if contract.status == 'processing' else 400
+        flash(error, 'error')
+        return redirect(url_for('preview_contract', contract_id=contract.id))
+    
+    contract.update_status('processing')
+    job_id = job_queue.submit(contract.id, pipeline.replace_document, doc_type, source)
+    
+    if wants_json:
+        return jsonify({
+            'contract_id': contract.id,
+            'job_id': job_id,
+            'status_url': url_for('contract_status', contract_id=contract.id),
+            'preview_url': url_for('preview_contract', contract_id=contract.id)
+        }), 202
+    flash('Document replaced, updating the contract', 'info')
+    return redirect(url_for('preview_contract', contract_id=contract.id))
+
+@app.route('/status/<contract_id>')
+def contract_status(contract_id):
+    """JSON processing status for a contract, polled by the preview page"""
+    contract = Contract.load(contract_id)
+    if not contract:
+        return jsonify({'error': 'Contract not found'}), 404
+    
+    job = get_store().get_latest_job(contract_id)
+    return jsonify({
+        'contract_id': contract.id,
+        'status': contract.status,
+        'stage': job['stage'] if job else None,
+        'progress': job['progress'] if job else (100 if contract.status == 'completed' else 0),
+        'message': job['message'] if job else None,
+        'preview_url': url_for('preview_contract', contract_id=contract.id)
+    })
+
 @app.route('/preview/<contract_id>')
 def preview_contract(contract_id):
     """Preview generated contract"""
@@ -125,36 +165,79 @@ def preview_contract(contract_id):
     if not contract:
         flash('Contract not found', 'error')
         return redirect(url_for('index'))
-    return render_template('preview.html', contract=contract)
+    job = get_store().get_latest_job(contract_id) if contract.status != 'completed' else None
+    clauses = contract.get_clauses() if contract.status == 'completed' else {}
+    return render_template('preview.html', contract=contract, job=job, clauses=clauses)
+
+@app.route('/preview/<contract_id>/body')
+def contract_body(contract_id):
+    """Blocks of the final contract as JSON, fetched in chunks by the preview page.
+    
+    Pass ``section`` for one '=== SECTION ===' (0 is any text before the first one),
+    or ``offset``/``limit`` for a range of blocks. ``highlights`` lists the extracted
+    clauses in the returned blocks as [block index, start, end, category].
+    """
+    contract = Contract.load(contract_id)
+    if not contract:
+        return jsonify({'error': 'Contract not found'}), 404
+    
+    section = request.args.get('section', type=int)
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', app.config['PREVIEW_CHUNK_BLOCKS'], type=int)
+    limit = max(1, min(limit, app.config['PREVIEW_MAX_CHUNK_BLOCKS']))
+    
+    # The body versions are blob hashes, so revalidation needs no body read at all
+    version = contract.document_version()
+    clauses_version = contract.body_version('extracted_clauses') or ''
+    etag = f"{version}-{clauses_version[:16]}-{f's{section}' if section is not None else f'{offset}-{limit}'}"
+    if version and etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        version, blocks = contract.get_blocks()
+        if section is not None:
+            starts = [0] + [i for i, block in enumerate(blocks) if block.level == SECTION and i > 0]
+            if not 0 <= section < len(starts):
+                return jsonify({'error': 'Section not found'}), 404
+            end = starts[section + 1] if section + 1 < len(starts) else len(blocks)
+            chunk = blocks[starts[section]:end]
+            payload = {'section': section, 'total_sections': len(starts)}
+        else:
+            chunk = blocks[offset:offset + limit]
+            payload = {'offset': offset, 'total_blocks': len(blocks),
+                       'next_offset': offset + limit if offset + limit < len(blocks) else None}
+        clause_set = contract.get_clause_set()
+        highlights = clause_set.highlights(chunk) if clause_set else []
+        response = jsonify(contract_id=contract.id, version=version, blocks=[block[:2] for block in chunk],
+                           highlights=highlights, **payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/history')
 def contract_history():
     """View all contracts with filtering and search"""
     status_filter = request.args.get('status', '')
     search_term = request.args.get('search', '')
-    
-    all_contracts = Contract.get_all()
-    
-    # Apply filters
-    if status_filter:
-        all_contracts = [c for c in all_contracts if c.status == status_filter]
+    after = request.args.get('after')
+    before = request.args.get('before')
+    per_page = request.args.get('per_page', app.config['HISTORY_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, app.config['HISTORY_MAX_PAGE_SIZE']))
     
     if search_term:
-        all_contracts = [c for c in all_contracts if search_term.lower() in c.contract_name.lower()]
-    
-    # Simple pagination simulation (for template compatibility)
-    class MockPagination:
-        def __init__(self, items):
-            self.items = items
-            self.has_prev = False
-            self.has_next = False
-            self.prev_num = None
-            self.next_num = None
-    
-    contracts = MockPagination(all_contracts)
+        # Full-text search over names, documents and clause categories, best match first
+        page = max(1, request.args.get('page', 1, type=int))
+        contracts = Contract.search(search_term, status=status_filter, per_page=per_page, page=page)
+    else:
+        try:
+            contracts = Contract.get_page(status=status_filter, per_page=per_page,
+                                          after=after, before=None if after else before)
+        except ValueError:
+            # Stale or tampered cursor, start again from the first page
+            contracts = Contract.get_page(status=status_filter, per_page=per_page)
     
     return render_template('history.html', contracts=contracts, 
-                         status_filter=status_filter, search_term=search_term)
+                         status_filter=status_filter, search_term=search_term,
+                         per_page=request.args.get('per_page', type=int))
 
 @app.route('/download/<contract_id>/<file_type>')
 def download_file(contract_id, file_type):
@@ -164,15 +247,56 @@ def download_file(contract_id, file_type):
         flash('Contract not found', 'error')
         return redirect(url_for('index'))
     
-    if file_type == 'docx' and contract.docx_path:
-        return send_file(contract.docx_path, as_attachment=True, 
-                        download_name=f"{contract.contract_name}.docx")
-    elif file_type == 'pdf' and contract.pdf_path:
-        return send_file(contract.pdf_path, as_attachment=True,
-                        download_name=f"{contract.contract_name}.pdf")
-    else:
+    if file_type not in ('docx', 'pdf'):
         flash('File not found', 'error')
         return redirect(url_for('preview_contract', contract_id=contract_id))
+    
+    download_name = f"{contract.contract_name}.{file_type}"
+    
+    # Contracts generated before on-demand rendering keep their original files
+    legacy_path = contract.docx_path if file_type == 'docx' else contract.pdf_path
+    if legacy_path and os.path.exists(legacy_path):
+        return send_download(legacy_path, download_name)
+    
+    # Resolved from metadata and body references only; the body is read just for a fresh render
+    version = contract.document_version() if contract.status == 'completed' else None
+    if not version:
+        flash('File not found', 'error')
+        return redirect(url_for('preview_contract', contract_id=contract_id))
+    
+    try:
+        file_path = render_cache.get_or_render(version, file_type, contract.contract_name,
+                                               lambda: contract.get_blocks()[1])
+    except Exception as e:
+        app.logger.error(f'Contract rendering error: {str(e)}')
+        flash(f'Error generating {file_type.upper()} file', 'error')
+        return redirect(url_for('preview_contract', contract_id=contract_id))
+    return send_download(file_path, download_name)
+
+def send_download(file_path, download_name):
+    """Send a generated file with a strong ETag, Last-Modified and Range support, or hand it to the proxy"""
+    file_path = os.path.join(app.root_path, file_path)
+    stat = os.stat(file_path)
+    # Cached renders are replaced rather than rewritten, so size and mtime identify the bytes
+    etag = f"{os.path.splitext(os.path.basename(file_path))[0][:24]}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    
+    offload = app.config['DOWNLOAD_OFFLOAD']
+    accel_path = None
+    if offload == 'x-accel-redirect':
+        # nginx maps an internal location onto GENERATED_FOLDER, so only files inside it can be offloaded
+        relative_path = os.path.relpath(file_path, os.path.join(app.root_path, app.config['GENERATED_FOLDER']))
+        if not relative_path.startswith('..'):
+            accel_path = f"{app.config['DOWNLOAD_ACCEL_PREFIX'].rstrip('/')}/{relative_path.replace(os.sep, '/')}"
+    
+    response = werkzeug_send_file(file_path, request.environ, as_attachment=True, download_name=download_name,
+                                  etag=etag, last_modified=stat.st_mtime, conditional=True,
+                                  use_x_sendfile=offload == 'x-sendfile' or accel_path is not None)
+    if accel_path and 'X-Sendfile' in response.headers:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = accel_path
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/delete/<contract_id>', methods=['POST'])
 def delete_contract(contract_id):
@@ -189,10 +313,8 @@ def delete_contract(contract_id):
         if contract.pdf_path and os.path.exists(contract.pdf_path):
             os.remove(contract.pdf_path)
         
-        # Delete contract file
-        contract_file = os.path.join(app.config['CONTRACTS_STORAGE'], f'{contract.id}.json')
-        if os.path.exists(contract_file):
-            os.remove(contract_file)
+        # Delete contract record
+        contract.delete()
         
         flash('Contract deleted successfully', 'success')
     except Exception as e:
@@ -247,9 +247,9 @@ function handleContractSubmission(form) {
 }
 
 /**
- * Show processing progress
+ * Show processing progress, polling the job status endpoint when one is given
  */
-function showProcessingProgress() {
+function showProcessingProgress(statusUrl, anchor) {
     const progressHTML = `
         <div id="processingProgress" class="mt-3">
             <div class="card">
@@ -260,22 +260,124 @@ function showProcessingProgress() {
                         </div>
                         <div class="flex-grow-1">
                             <h6 class="mb-1">Processing Your Contract</h6>
-                            <small class="text-muted">Analyzing documents and extracting clauses...</small>
+                            <small class="text-muted" id="processingStage">Analyzing documents and extracting clauses...</small>
                         </div>
                     </div>
                     <div class="progress mt-2" style="height: 4px;">
-                        <div class="progress-bar progress-bar-striped progress-bar-animated" 
-                             role="progressbar" style="width: 100%"></div>
+                        <div class="progress-bar progress-bar-striped progress-bar-animated" id="processingBar"
+                             role="progressbar" style="width: ${statusUrl ? 0 : 100}%"></div>
                     </div>
                 </div>
             </div>
         </div>
     `;
     
-    const form = document.getElementById('uploadForm');
-    if (form) {
-        form.insertAdjacentHTML('afterend', progressHTML);
+    const target = anchor || document.getElementById('uploadForm');
+    if (target) {
+        target.insertAdjacentHTML('afterend', progressHTML);
     }
+    
+    if (statusUrl) {
+        pollProcessingStatus(statusUrl);
+    }
+}
+
+/**
+ * Poll a contract status URL until processing completes or fails
+ */
+function pollProcessingStatus(statusUrl, interval = 1000) {
+    fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(status => {
+            const bar = document.getElementById('processingBar');
+            const stage = document.getElementById('processingStage');
+            if (bar) bar.style.width = `${status.progress || 0}%`;
+            if (stage && status.message) stage.textContent = status.message;
+            
+            if (status.status === 'completed' || status.status === 'error') {
+                window.location.href = status.preview_url;
+            } else {
+                setTimeout(() => pollProcessingStatus(statusUrl, interval), interval);
+            }
+        })
+        .catch(() => {
+            setTimeout(() => pollProcessingStatus(statusUrl, interval * 2), interval * 2);
+        });
+}
+
+/**
+ * Fill the contract preview from its JSON body endpoint, one chunk of blocks at a time
+ */
+function loadContractBody(container, offset = 0) {
+    if (!container) return;
+    const url = `${container.dataset.bodyUrl}?offset=${offset}`;
+    
+    fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(body => {
+            const marks = {};
+            (body.highlights || []).forEach(([index, start, end, category]) => {
+                (marks[index] = marks[index] || []).push([start, end, category]);
+            });
+            
+            const fragment = document.createDocumentFragment();
+            body.blocks.forEach(([level, text], index) => {
+                // Level 1 is a section header, 2 a subsection header, 0 body text
+                const element = document.createElement(level === 1 ? 'h3' : level === 2 ? 'h5' : 'p');
+                appendHighlightedText(element, text, marks[index] || []);
+                fragment.appendChild(element);
+            });
+            container.appendChild(fragment);
+            
+            const loading = document.getElementById('contractBodyLoading');
+            if (loading) loading.remove();
+            if (body.next_offset !== null) {
+                loadContractBody(container, body.next_offset);
+            } else if (!body.total_blocks) {
+                showContractBodyEmpty();
+            }
+        })
+        .catch(showContractBodyEmpty);
+}
+
+/**
+ * Append text to an element, wrapping the ranges of extracted clauses in <mark> elements
+ */
+function appendHighlightedText(element, text, marks) {
+    if (!marks.length) {
+        element.textContent = text;
+        return;
+    }
+    
+    // Cut the text at every clause boundary; each piece is marked with the clauses covering it
+    const cuts = [...new Set([0, text.length, ...marks.flatMap(([start, end]) => [start, end])])]
+        .sort((a, b) => a - b);
+    for (let i = 0; i < cuts.length - 1; i++) {
+        const piece = text.slice(cuts[i], cuts[i + 1]);
+        const categories = [...new Set(marks
+            .filter(([start, end]) => start <= cuts[i] && cuts[i + 1] <= end)
+            .map(([, , category]) => category))];
+        if (!categories.length) {
+            element.appendChild(document.createTextNode(piece));
+            continue;
+        }
+        const mark = document.createElement('mark');
+        mark.className = 'clause-highlight';
+        mark.dataset.categories = categories.join(' ');
+        mark.title = categories.map(category => category.replace(/_/g, ' ')).join(', ');
+        mark.textContent = piece;
+        element.appendChild(mark);
+    }
+}
+
+function showContractBodyEmpty() {
+    const loading = document.getElementById('contractBodyLoading');
+    const empty = document.getElementById('contractBodyEmpty');
+    if (loading) loading.remove();
+    if (empty) empty.classList.remove('d-none');
 }
 
 /**
@@ -468,6 +570,7 @@ window.CPGenerator = {
     showAlert,
     copyToClipboard,
     downloadFile,
+    loadContractBody,
     printContract,
     toggleFullscreen,
     handleContractSubmission
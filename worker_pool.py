@@ -0,0 +1,46 @@
+import multiprocessing
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from typing import Callable, Optional
+
+class SpawnedPool:
+    """Process pool started on first use and restartable after shutdown.
+    
+    Workers are spawned rather than forked: the web app runs background job threads,
+    and forking a process with running threads can leave locks held in the child.
+    """
+    
+    def __init__(self, max_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+    
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run fn in a worker, starting new workers if none are running or the last ones died"""
+        try:
+            return self._start().submit(fn, *args)
+        except BrokenExecutor:
+            # A worker was killed (OOM, a crash on a bad page); its pool refuses all further work
+            self.terminate()
+            return self._start().submit(fn, *args)
+    
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=self.initializer, initargs=self.initargs)
+        return self._executor
+    
+    def shutdown(self):
+        """Stop the workers, if any were started; the next submit starts new ones"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+    
+    def terminate(self):
+        """Kill the workers without waiting, e.g. when one is stuck; pending futures fail with BrokenProcessPool"""
+        if self._executor is not None:
+            for process in list((self._executor._processes or {}).values()):
+                process.terminate()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None